@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Benchmarks of the framework: tool runs on instances, per phase, and
+micro-benchmarks of the pure-Python hot paths of the result analysis.
+
+    python src/bntaxonomy/bench.py run -ig experiments/instances/B_manually_designed --repeat 5 -o bench.json
+    python src/bntaxonomy/bench.py compare baseline.json bench.json
+
+Results are written to a JSON file holding the samples of every measure, so
+that a later run can be compared against it as a baseline.
+"""
+if __name__ == "__main__":
+    import sys
+    from os.path import dirname, abspath
+
+    libdir = dirname(dirname(abspath(__file__)))
+    sys.path.insert(0, libdir)
+
+from argparse import ArgumentParser
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bntaxonomy.utils.control import CtrlResult
+
+METRICS = ("wall", "cpu", "max_rss")
+DEFAULT_THRESHOLD = 0.10  # relative change of the median
+DEFAULT_ALPHA = 0.05  # significance level of the one-sided Mann-Whitney U test
+MIN_SAMPLES = 3  # below, changes are judged on the threshold only
+
+
+# ---------------------------------
+# Tool runs
+# ---------------------------------
+def _run_tool_once(inst_path: str, tool_name: str, max_size: int, workdir: str, trace_fname: str):
+    """Runs a tool on a copy of an instance, in a fresh process, with tracing."""
+    from bntaxonomy.experiment import ExperimentHandler
+    from bntaxonomy.iface import get_tool
+    from bntaxonomy.utils.trace import configure_tracing
+
+    toolcls = get_tool(tool_name)
+    toolcls.load()  # not accounted to the tool run
+    configure_tracing(trace_fname)
+    exp = ExperimentHandler(
+        os.path.basename(inst_path),
+        f"{workdir}/input",
+        f"{workdir}/output",
+        max_size,
+        to_console=False,
+    )
+    exp.run_tool(toolcls)
+    with open(f"{workdir}/output/{tool_name}_status.json") as _f:
+        return json.load(_f)["status"]
+
+
+def _copy_instance(inst_path: str, dest: str):
+    os.makedirs(dest)
+    for fname in ("transition_formula.bnet", "setting.json"):
+        shutil.copy(f"{inst_path}/{fname}", dest)
+
+
+def bench_tools(
+    instances: list[str], tools: list[str], max_size: int, repeat: int, warm: bool
+) -> dict[str, dict]:
+    """Runs every (instance, tool) pair `repeat` times, each in a new process.
+
+    Runs work on a copy of the instance, so that the caches of `experiments`
+    are neither used nor modified. A cold run starts from an empty cache; with
+    `warm`, the repetitions share a cache filled by an extra, unrecorded run.
+    """
+    from bntaxonomy.utils.trace import phase_stats
+
+    ctx = multiprocessing.get_context("spawn")
+    results = dict()
+    for inst_path in instances:
+        inst = os.path.basename(inst_path)
+        for tool in tools:
+            with tempfile.TemporaryDirectory(prefix="bntaxonomy_bench_") as tmpdir:
+                runs = list(range(repeat + 1 if warm else repeat))
+                for run in runs:
+                    workdir = f"{tmpdir}/run{run}"
+                    os.makedirs(workdir)
+                    if warm and run > 0:
+                        shutil.copytree(f"{tmpdir}/run0/input", f"{workdir}/input")
+                    else:
+                        _copy_instance(inst_path, f"{workdir}/input")
+                    trace_fname = f"{workdir}/trace.jsonl"
+                    with ctx.Pool(1) as pool:
+                        status = pool.apply(
+                            _run_tool_once, (inst_path, tool, max_size, workdir, trace_fname)
+                        )
+                    print(f"{inst:<24} {tool:<20} run {run}: {status}", file=sys.stderr)
+                    if warm and run == 0:
+                        continue
+                    for (_, _, phase), stats in phase_stats(trace_fname).items():
+                        entry = results.setdefault(
+                            f"{inst}|{tool}|{phase}", {m: [] for m in METRICS} | {"status": []}
+                        )
+                        for m in METRICS:
+                            entry[m].append(stats[m])
+                        entry["status"].append(status)
+    return results
+
+
+# ---------------------------------
+# Micro-benchmarks
+# ---------------------------------
+def random_controls(
+    rng: random.Random, n_ctrl: int, n_genes: int, max_size: int
+) -> list[dict[str, int]]:
+    genes = [f"g{i}" for i in range(n_genes)]
+    return [
+        {g: rng.randint(0, 1) for g in rng.sample(genes, rng.randint(1, max_size))}
+        for _ in range(n_ctrl)
+    ]
+
+
+def _micro_drop_nonminimal(rng: random.Random):
+    d_list = random_controls(rng, 20000, 60, 5)
+    return lambda: CtrlResult("bench", [dict(d) for d in d_list]).drop_nonminimal()
+
+
+def _micro_mutation_score(rng: random.Random):
+    result = CtrlResult("bench", random_controls(rng, 2000, 40, 4))
+    literals = [(f"g{i}", v) for i in range(10) for v in (0, 1)]
+    return lambda: [result.compute_mutation_score(g, v, 40) for g, v in literals]
+
+
+def _micro_mutation_scores(rng: random.Random):
+    result = CtrlResult("bench", random_controls(rng, 20000, 40, 4))
+    literals = [(f"g{i}", v) for i in range(40) for v in (0, 1)]
+    return lambda: result.compute_mutation_scores(literals, 40)
+
+
+def _micro_multi_input_summary(rng: random.Random):
+    from bntaxonomy.hierarchy import MultiInputSummary, SingleInputSummary
+
+    tools = [f"tool{i}" for i in range(12)]
+    instances = list()
+    for i in range(60):
+        base = random_controls(rng, 300, 30, 3)
+        # tools keep random subsets of the same controls, so that some cover others
+        results = [CtrlResult(t, rng.sample(base, rng.randint(1, len(base)))) for t in tools]
+        instances.append((f"inst{i}", results))
+
+    def run():
+        exps = [SingleInputSummary(results, name) for name, results in instances]
+        MultiInputSummary(exps, "bench", {"all": exps})
+
+    return run
+
+
+MICRO_BENCHMARKS = {
+    "CtrlResult.drop_nonminimal": _micro_drop_nonminimal,
+    "CtrlResult.compute_mutation_score": _micro_mutation_score,
+    "CtrlResult.compute_mutation_scores": _micro_mutation_scores,
+    "MultiInputSummary": _micro_multi_input_summary,
+}
+
+
+def bench_micro(names: list[str], repeat: int, seed: int) -> dict[str, dict]:
+    """Times the micro-benchmarks on synthetic control lists (built from `seed`)."""
+    results = dict()
+    for name in names:
+        func = MICRO_BENCHMARKS[name](random.Random(seed))
+        func()  # warm-up
+        entry = results[f"micro|{name}"] = {"wall": [], "cpu": []}
+        for _ in range(repeat):
+            start, cpu_start = time.perf_counter(), time.process_time()
+            func()
+            entry["wall"].append(time.perf_counter() - start)
+            entry["cpu"].append(time.process_time() - cpu_start)
+        print(f"{name:<40} {statistics.median(entry['wall']):>9.4f}s", file=sys.stderr)
+    return results
+
+
+# ---------------------------------
+# Comparison
+# ---------------------------------
+def mann_whitney_p(base: list[float], cur: list[float]) -> float:
+    """One-sided p-value of the Mann-Whitney U test that `cur` tends to be
+    larger than `base` (normal approximation with tie correction)."""
+    n1, n2 = len(base), len(cur)
+    ranked = sorted((v, i) for i, v in enumerate(base + cur))
+    ranks = [0.0] * (n1 + n2)
+    ties = 0.0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[ranked[k][1]] = (i + j) / 2 + 1
+        ties += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    u = sum(ranks[n1:]) - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    var = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if var <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(var)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline: dict, current: dict, threshold: float, alpha: float) -> list[dict]:
+    """Changes of the median of every measure of `current` against `baseline`.
+
+    A measure regresses if its median grows by more than `threshold` and, with
+    enough samples, the growth is significant at `alpha`.
+    """
+    rows = list()
+    for key, cur in sorted(current["results"].items()):
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        for m in METRICS:
+            if not base.get(m) or not cur.get(m):
+                continue
+            b_med, c_med = statistics.median(base[m]), statistics.median(cur[m])
+            change = (c_med - b_med) / b_med if b_med > 0 else 0.0
+            if min(len(base[m]), len(cur[m])) >= MIN_SAMPLES:
+                p = mann_whitney_p(base[m], cur[m])
+            else:
+                p = None
+            regression = change > threshold and (p is None or p < alpha)
+            rows.append(
+                {
+                    "key": key,
+                    "metric": m,
+                    "baseline": b_med,
+                    "current": c_med,
+                    "change": change,
+                    "p": p,
+                    "regression": regression,
+                }
+            )
+    return rows
+
+
+def print_report(rows: list[dict]):
+    print(f"{'benchmark':<60} {'metric':<8} {'baseline':>12} {'current':>12} {'change':>8} {'p':>7}")
+    for r in rows:
+        p = "-" if r["p"] is None else f"{r['p']:.3f}"
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(
+            f"{r['key']:<60} {r['metric']:<8} {r['baseline']:>12.4g} {r['current']:>12.4g}"
+            f" {r['change']:>+8.1%} {p:>7}{flag}"
+        )
+
+
+# ---------------------------------
+# Entry point
+# ---------------------------------
+def _commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except OSError:
+        return ""
+    return out.stdout.strip()
+
+
+def _select_instances(args) -> list[str]:
+    instances = list(args.instances)
+    for grp in args.inst_groups:
+        for name in sorted(os.listdir(grp)):
+            if os.path.isdir(os.path.join(grp, name)):
+                instances.append(os.path.join(grp, name))
+    return instances
+
+
+def main(argv=None):
+    ap = ArgumentParser(description="Benchmark tool runs and analysis hot paths.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ap_run = sub.add_parser("run", help="Run the benchmarks and save their samples.")
+    ap_run.add_argument("-i", "--instances", nargs="+", default=list(), help="Instance folders.")
+    ap_run.add_argument("-ig", "--inst_groups", nargs="+", default=list(), help="Instance-group directories.")
+    ap_run.add_argument("--tools", nargs="*", default=list(), help="Tools to run on every instance.")
+    ap_run.add_argument("--max-size", type=int, default=2, help="Maximum number of perturbations.")
+    ap_run.add_argument("--repeat", type=int, default=5, help="Repetitions of every benchmark.")
+    ap_run.add_argument("--warm", action="store_true", help="Run tools with a filled cache.")
+    ap_run.add_argument(
+        "--micro",
+        nargs="*",
+        choices=list(MICRO_BENCHMARKS),
+        default=None,
+        help="Run micro-benchmarks (all of them if none is given).",
+    )
+    ap_run.add_argument("--seed", type=int, default=0, help="Seed of the synthetic control lists.")
+    ap_run.add_argument("-o", "--output", required=True, help="JSON file of the samples.")
+    ap_run.add_argument("--baseline", default=None, help="Compare the run against this file.")
+
+    ap_cmp = sub.add_parser("compare", help="Compare two benchmark files.")
+    ap_cmp.add_argument("baseline")
+    ap_cmp.add_argument("current")
+
+    for p in (ap_run, ap_cmp):
+        p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Tolerated relative change of the median.")
+        p.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="Significance level of a regression.")
+
+    args = ap.parse_args(argv)
+
+    if args.command == "run":
+        from bntaxonomy.iface import load_tools, tool_names
+
+        load_tools()
+        unknown = set(args.tools) - set(tool_names())
+        if unknown:
+            ap.error(f"Unknown or unavailable tools: {sorted(unknown)}")
+        results = dict()
+        if args.tools:
+            results |= bench_tools(
+                _select_instances(args), args.tools, args.max_size, args.repeat, args.warm
+            )
+        if args.micro is not None:
+            results |= bench_micro(args.micro or list(MICRO_BENCHMARKS), args.repeat, args.seed)
+        current = {
+            "meta": {
+                "commit": _commit(),
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "cpus": os.cpu_count(),
+                "max_size": args.max_size,
+                "repeat": args.repeat,
+                "warm": args.warm,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as _f:
+            json.dump(current, _f, indent=1)
+        if args.baseline is None:
+            return 0
+        with open(args.baseline) as _f:
+            baseline = json.load(_f)
+    else:
+        with open(args.baseline) as _f:
+            baseline = json.load(_f)
+        with open(args.current) as _f:
+            current = json.load(_f)
+
+    print(f"baseline: {baseline['meta'].get('commit', '')[:12]}  current: {current['meta'].get('commit', '')[:12]}")
+    rows = compare(baseline, current, args.threshold, args.alpha)
+    print_report(rows)
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
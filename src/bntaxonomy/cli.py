@@ -6,16 +6,94 @@ if __name__ == "__main__":
     sys.path.insert(0, libdir)
 
 from argparse import ArgumentParser
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 import os.path
 
 from bntaxonomy.iface import load_tools, tool_names
 from bntaxonomy.utils.log import main_logger, configure_logging
-from bntaxonomy.experiment import ExperimentHandler
+from bntaxonomy.utils.primes import warm_primes
+from bntaxonomy.utils.trace import PHASE_GRAPH_EXPORT, PROFILERS, configure_tracing, span, trace_tags
+from bntaxonomy.experiment import ExperimentHandler, run_tool_job
 from bntaxonomy.hierarchy import SingleInputSummary
+from bntaxonomy.store import ResultStore, default_store
 import os
 
 
+def store_fname(exp: ExperimentHandler, store: str) -> str:
+    """Result store of an experiment: `store`, or if empty, the store at the
+    root of the result folders of the experiment (`<root>/<group>/<instance>`)."""
+    return store or default_store(os.path.dirname(os.path.dirname(exp.output_path)))
+
+
+def save_summary(exp: ExperimentHandler, store: str | None = None):
+    """Saves the summary graph of an instance and, unless `store` is None,
+    copies its results to the result store (see `store_fname`)."""
+    exp_run = SingleInputSummary.from_folder(exp.output_path, exp.name)
+    with trace_tags(instance=exp.name), span("save_summary", PHASE_GRAPH_EXPORT):
+        exp_run.save(f"{exp.output_path}/_graph")
+    if store is None:
+        return
+    group = os.path.basename(os.path.dirname(exp.output_path))
+    with ResultStore(store_fname(exp, store)) as _store:
+        _store.import_folder(exp.output_path, exp.name, group, list(exp.org_bnet.keys()))
+
+
+def run_jobs(
+    experiments: list[ExperimentHandler], filter_tools, jobs: int, store: str | None = None
+):
+    """Run every (instance, tool) pair as an independent job on a process pool.
+
+    Instances are preprocessed by the caller, so workers share the propagated
+    network and the cache directory of each instance. When some tools of an
+    instance use its prime implicants, they are first computed and saved in
+    its cache directory by a single job, and the tool jobs of the instance are
+    submitted once it is done, so that they only load them. The summary graph
+    of an instance is saved, and its results stored, as soon as its last tool
+    finishes. Only this process writes to the result store.
+    """
+    remaining = dict()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = dict()
+        warming = dict()
+
+        def submit_tools(exp):
+            for toolcls in exp.selected_tools(filter_tools):
+                futures[executor.submit(run_tool_job, exp, toolcls.name)] = exp
+
+        for exp in experiments:
+            tools = exp.selected_tools(filter_tools)
+            remaining[exp] = len(tools)
+            if not tools:
+                save_summary(exp, store)
+            elif any(toolcls.uses_primes for toolcls in tools):
+                warming[executor.submit(warm_primes, exp.bnet_file, exp.cachedir)] = exp
+            else:
+                submit_tools(exp)
+
+        while futures or warming:
+            done, _ = wait([*futures, *warming], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in warming:
+                    exp = warming.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # the tools compute the primes themselves
+                        main_logger.warning(f"Could not precompute the primes of {exp.name}: {e}")
+                    submit_tools(exp)
+                    continue
+                exp = futures.pop(future)
+                try:
+                    tool_name = future.result()
+                    main_logger.info(f"Finished {exp.name}: {tool_name}")
+                except Exception as e:
+                    main_logger.error(f"Error running a job of {exp.name}: {e}")
+                remaining[exp] -= 1
+                if remaining[exp] == 0:
+                    save_summary(exp, store)
+
+
 def main():
     configure_logging("cli")
     load_tools()
@@ -55,8 +133,62 @@ def main():
         action="store_true",
         help="Clear any existing cache for each experiment before running tools.",
     )
-    
+    ap.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of (instance, tool) jobs to run in parallel on a process pool.",
+    )
+    ap.add_argument(
+        "--tool-workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used within a tool run, for tools declaring `parallel` (PBN[SA], PBN[ASA], CABEAN[ITC], CABEAN[TTC], CABEAN[PTC]).",
+    )
+    ap.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="Stop tools supporting it (CABEAN[ITC], CABEAN[TTC], CABEAN[PTC]) at the first control larger than max_size.",
+    )
+    ap.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Wall-clock limit (in seconds) per tool run; the tool is killed beyond it.",
+    )
+    ap.add_argument(
+        "--max-rss",
+        type=float,
+        default=None,
+        help="Resident memory limit (in MB) per tool run; the tool is killed beyond it.",
+    )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip tools whose results are up to date with the model, the setting and the options.",
+    )
+    ap.add_argument(
+        "--trace",
+        default=None,
+        help="Append timing spans (JSON lines, Chrome trace events) of every phase and tool run to this file.",
+    )
+    ap.add_argument(
+        "--profile",
+        choices=PROFILERS,
+        default=None,
+        help="Profile each tool run; the profile is written next to its result.",
+    )
+    ap.add_argument(
+        "--store",
+        nargs="?",
+        const="",
+        default=None,
+        help="Update a result store with the results of each instance: PATH, or results.sqlite at the root of the result folders (e.g. experiments/results) if no PATH is given.",
+    )
+
     args = ap.parse_args()
+    configure_tracing(args.trace)
     for grp in args.inst_groups:
         if not os.path.isdir(grp):
             ap.error(f"Instance group path not a directory: {grp}")
@@ -65,6 +197,7 @@ def main():
             if os.path.isdir(path):
                 args.instances.append(path)
 
+    experiments = list()
     for inst in args.instances:
         if not os.path.isdir(inst):
             main_logger.warning(f" {inst} is not a directory, ignoring")
@@ -97,10 +230,21 @@ def main():
             exclude_targets=args.exclude_targets,
             print_output=args.print_output,
             clear_cache=args.clear_cache,
+            timeout=args.timeout,
+            max_rss=args.max_rss,
+            resume=args.resume,
+            tool_workers=args.tool_workers,
+            profile=args.profile,
+            early_stop=args.early_stop,
         )
-        exp.run_tools(args.tools)
-        exp_run = SingleInputSummary.from_folder(opath, inst)
-        exp_run.save(f"{opath}/_graph")
+        if args.jobs > 1:
+            experiments.append(exp)
+        else:
+            exp.run_tools(args.tools)
+            save_summary(exp, args.store)
+
+    if experiments:
+        run_jobs(experiments, args.tools, args.jobs, args.store)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,9 @@
 import networkx as nx
+import numpy as np
 from pyeda.boolalg.minimization import *
 import pyeda.boolalg.expr
-from pyeda.inter import expr
+from pyeda.boolalg.table import truthtable
+from pyeda.inter import expr, exprvar
 
 from colomoto import minibn
 
@@ -46,32 +48,88 @@ def bn_of_asynchronous_transition_graph(adyn, names,
     Returned object will be of `bn_class`, instantiated with a dictionnary
     mapping component names to a string representation of their Boolean expression.
     """
-    relabel = {label: parse_node(label) for label in adyn.nodes()}
-    adyn = nx.relabel_nodes(adyn, relabel)
-    n = len(next(iter(adyn.nodes)))
-    assert n == len(names), "list of component names and dimension of configuraitons seem different"
+    n = len(names)
+    assert n <= 32, "transitions are stored on 32 bits, at most 32 components are supported"
     assert adyn.number_of_nodes() == 2**n, "unexpected number of nodes in the transition graph"
+    weights = 1 << np.arange(n, dtype=np.int64)
+    code = {}
+    for label in adyn.nodes():
+        x = parse_node(label)
+        assert len(x) == n, "list of component names and dimension of configuraitons seem different"
+        code[label] = int(np.dot(x, weights))
+    succ = np.zeros(2**n, dtype=np.uint32)
+    for u, v in adyn.edges():
+        diff = code[u] ^ code[v]
+        if diff and not diff & (diff - 1):
+            succ[code[u]] |= diff
+    return bn_of_asynchronous_transition_array(succ, names, bn_class=bn_class, simplify=simplify)
 
-    def expr_of_cfg(x):
-        e = "&".join(f"{'~' if not v else ''}{names[i]}" for i, v in enumerate(x))
-        return f"({e})"
-
-    f = []
-    for i in range(n):
-        pos = []
-        for x in adyn.nodes():
-            dx = list(x)
-            dx[i] = 1-x[i]
-            y = dx if tuple(dx) in adyn[x] else x
-            target = y[i]
-            if target:
-                pos.append(x)
-        if not pos:
-            f.append(expr("0"))
-        else:
-            e = expr("|".join(map(expr_of_cfg,pos)))
-            e, = espresso_exprs(e.to_dnf())
-            f.append(e)
+
+def local_truth_tables(succ):
+    """
+    Truth tables of the local functions of an asynchronous transition graph
+    given as a successor bitmap (see `bn_of_asynchronous_transition_array`).
+
+    Bit `i` of the returned `f[s]` is the value of the `i`-th local function
+    in the configuration of code `s`: the `i`-th component changes in `s` if
+    and only if `s` has a transition along it.
+    """
+    return np.arange(len(succ), dtype=succ.dtype) ^ succ
+
+
+def support_of_truth_table(tt):
+    """
+    Variables a truth table (of size 2^n, indexed by configuration codes)
+    depends on.
+    """
+    n = len(tt).bit_length() - 1
+    return [j for j in range(n)
+            if (tt.reshape(-1, 2, 1 << j)[:, 0] != tt.reshape(-1, 2, 1 << j)[:, 1]).any()]
+
+
+def expr_of_truth_table(tt, names):
+    """
+    Minimized pyeda expression of the truth table `tt` of a function of the
+    variables `names`, where bit `j` of the index of a row is the value of
+    `names[j]`.
+
+    The table is first restricted to the variables the function depends on,
+    so that espresso only sees the support of the function.
+    """
+    tt = np.asarray(tt, dtype=bool)
+    support = support_of_truth_table(tt)
+    for j in reversed(range(len(names))):
+        if j not in support:
+            tt = tt.reshape(-1, 2, 1 << j)[:, 0].reshape(-1)
+    if not support:
+        return expr("1" if tt[0] else "0")
+    if len(support) == 1:
+        v = exprvar(names[support[0]])
+        return v if tt[1] else ~v
+    inputs = [exprvar(names[j]) for j in support]
+    e, = espresso_tts(truthtable(inputs, tt.astype(np.uint8).tolist()))
+    return e
+
+
+def bn_of_asynchronous_transition_array(succ, names,
+            bn_class=minibn.BooleanNetwork,
+            simplify=True):
+    """
+    Convert the transition graph of a (fully) asynchronous Boolean network,
+    given as a successor bitmap, to a propositional logic representation.
+
+    Configurations are identified by their code, whose bit `i` is the value of
+    component `names[i]`; bit `i` of `succ[s]` is set if the configuration
+    of code `s` has a transition changing component `names[i]`. `succ` must
+    thus be an array of unsigned integers of size 2^n.
+    """
+    n = len(names)
+    succ = np.asarray(succ)
+    assert np.issubdtype(succ.dtype, np.unsignedinteger) and n <= 8 * succ.dtype.itemsize, \
+        "succ must be an array of unsigned integers of at least n bits"
+    assert len(succ) == 2**n, "unexpected number of configurations in the transition graph"
+    f = local_truth_tables(succ)
+    f = [expr_of_truth_table((f >> i) & 1, names) for i in range(n)]
     f = map(expr2str, f)
     f = bn_class(dict(zip(names, f)))
     if simplify:
@@ -16,6 +16,7 @@ import matplotlib.pyplot as plt
 import matplotlib.transforms as mtransforms
 
 from bntaxonomy.hierarchy import MultiInputSummary
+from bntaxonomy.store import ResultStore
 
 
 # ---------------------------------------------------------------------
@@ -218,6 +219,11 @@ def main(argv=None):
         help="Output figure format (default: png).",
         default="png",
     )
+    parser.add_argument(
+        "--store",
+        help="Read the results from this result store (see bntaxonomy/store.py) instead of the result folders.",
+        default=None,
+    )
     args = parser.parse_args(argv)
 
     if args.genes:
@@ -236,7 +242,18 @@ def main(argv=None):
     # -----------------------------------------------------------------
     # Summaries from experiment groups
     # -----------------------------------------------------------------
-    if inst_groups:
+    if args.store:
+        with ResultStore(args.store) as store:
+            hc = MultiInputSummary.from_store(
+                store,
+                groups=[os.path.basename(p.rstrip("/")) for p in inst_groups] or None,
+                instances=(
+                    [os.path.basename(p.rstrip("/")) for p in instances]
+                    if instances
+                    else None
+                ),
+            )
+    elif inst_groups:
         hc = MultiInputSummary.from_inst_groups(inst_groups, "Hierarchy")
     elif args.instances:
         hc = MultiInputSummary.from_instances(instances, "Hierarchy")
@@ -273,8 +290,8 @@ def main(argv=None):
     mcs_score_list = []  # (Instance, Tool, Gene, Sign, BN_size, Score)
     for exp in hc.exp_list:
         inst_name = exp.name
-        n_nodes = len(exp.bn)
-        bn_keys = tuple(exp.bn.keys())  # stable order once
+        n_nodes = len(exp.bn_nodes)
+        bn_keys = tuple(exp.bn_nodes)  # stable order once
 
         for tool_result in exp.results:
             tool_name = tool_result.name
@@ -285,18 +302,18 @@ def main(argv=None):
                 count_list.append((inst_name, tool_name, n_nodes, math.inf, dict()))
 
             gene_set = tool_result.get_controlled_gene_set()
+            scores = tool_result.compute_mutation_scores(
+                [(gene, sign) for gene in gene_set for sign in (0, 1)]
+                + [("_DUMMY_GENE_", 1)],
+                n_nodes,
+            )
             for gene in gene_set:
                 for sign in (0, 1):
-                    score, ctrl_list = tool_result.compute_mutation_score(
-                        gene, sign, n_nodes
-                    )
                     mcs_score_list.append(
-                        (inst_name, tool_name, gene, sign, n_nodes, score)
+                        (inst_name, tool_name, gene, sign, n_nodes, scores[(gene, sign)])
                     )
 
-            base_score, _ = tool_result.compute_mutation_score(
-                "_DUMMY_GENE_", 1, n_nodes
-            )
+            base_score = scores[("_DUMMY_GENE_", 1)]
             for gene in bn_keys:
                 if gene in gene_set:
                     continue
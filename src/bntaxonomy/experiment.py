@@ -1,15 +1,34 @@
 from __future__ import annotations
+import contextlib
+import hashlib
 import json
 import os
 import shutil
+import time
 
 from colomoto.minibn import BooleanNetwork
 
-from bntaxonomy.utils.control import CtrlResult
+from bntaxonomy.utils.cache import file_digest
+from bntaxonomy.utils.control import CtrlResult, CtrlSink
 from bntaxonomy.utils.log import main_logger
-from bntaxonomy.utils.control import suppress_console_output
+from bntaxonomy.utils.console import capture_console_output
+from bntaxonomy.utils.trace import (
+    PHASE_POSTPROCESS,
+    PHASE_PROPAGATION,
+    PHASE_SOLVE,
+    PHASE_TOOL,
+    profiled,
+    span,
+    trace_tags,
+)
+from bntaxonomy.utils.process import (
+    STATUS_ERROR,
+    STATUS_OK,
+    STATUS_OOM,
+    run_supervised,
+)
 
-from bntaxonomy.iface import registered_tools
+from bntaxonomy.iface import get_tool, registered_tools, tool_version
 
 
 class ExperimentHandler:
@@ -30,6 +49,12 @@ class ExperimentHandler:
         load_precompute: bool = False,
         print_output: bool = False,
         clear_cache: bool = False,
+        timeout: float | None = None,
+        max_rss: float | None = None,
+        resume: bool = False,
+        tool_workers: int = 1,
+        profile: str | None = None,
+        early_stop: bool = False,
     ):
         self.name = name
         self.input_path = input_path
@@ -42,6 +67,14 @@ class ExperimentHandler:
         self.load_precompute = load_precompute
         self.print_output = print_output
         self.clear_cache = clear_cache
+        self.timeout = timeout  # seconds
+        self.max_rss = max_rss  # megabytes
+        self.resume = resume
+        self.tool_workers = tool_workers
+        self.profile = profile  # profiler of the tool runs, see utils.trace.profiled
+        self.early_stop = early_stop
+        self.use_propagated = use_propagated
+        self.exclude_targets = exclude_targets
         self.results: list[CtrlResult] = list()
         os.makedirs(output_path, exist_ok=True)
 
@@ -59,15 +92,16 @@ class ExperimentHandler:
         self.org_bnet = BooleanNetwork(data=self.bnet_fname)
 
         # Load the Boolean network for experiments
-        if use_propagated:
-            from bntaxonomy.iface.mpbn import propagate_bn
+        with trace_tags(instance=name), span("propagate_bn", PHASE_PROPAGATION):
+            if use_propagated:
+                from bntaxonomy.iface.mpbn import propagate_bn
 
-            self.bn = propagate_bn(self.org_bnet, self.inputs)
-            self.inputs = {}
-        else:
-            self.bn = self.org_bnet
-            self.bn |= self.inputs
-            self.inputs = {}
+                self.bn = propagate_bn(self.org_bnet, self.inputs)
+                self.inputs = {}
+            else:
+                self.bn = self.org_bnet
+                self.bn |= self.inputs
+                self.inputs = {}
 
         self.cachedir = os.path.join(self.input_path, "cache")
         if clear_cache:
@@ -86,12 +120,48 @@ class ExperimentHandler:
         self.primes = None
         self.cabean = None
 
+    def sink_fname(self, toolcls, full: bool = False) -> str:
+        return f"{self.output_path}/{toolcls.name}{'_full' if full else ''}.partial.jsonl"
+
+    def collect(self, toolcls, controls) -> int:
+        """Streams the controls produced by a tool to its sink files.
+
+        Controls are filtered by size and minimality as they arrive. If the
+        tool is interrupted, the sink files hold its partial result.
+        """
+        with contextlib.ExitStack() as stack:
+            sink = stack.enter_context(
+                CtrlSink(
+                    self.sink_fname(toolcls),
+                    size_limit=self.max_size,
+                    only_minimal=self.only_minimal,
+                )
+            )
+            full_sink = None
+            if self.dump_full:
+                full_sink = stack.enter_context(
+                    CtrlSink(self.sink_fname(toolcls, full=True))
+                )
+            for ctrl in controls:
+                if full_sink is not None:
+                    full_sink.add(ctrl)
+                sink.add(ctrl)
+        return sink.count
+
+    @span("finalize", PHASE_POSTPROCESS)
+    def finalize(self, toolcls) -> CtrlResult:
+        """Reads back the sink files of a tool and post-processes its result."""
+        if self.dump_full:
+            full_fname = self.sink_fname(toolcls, full=True)
+            CtrlSink.convert(full_fname, f"{self.output_path}/{toolcls.name}_full.json")
+            os.remove(full_fname)
+        fname = self.sink_fname(toolcls)
+        ctrl_result = CtrlSink.load(toolcls.name, fname)
+        os.remove(fname)
+        return self.postprocess(ctrl_result)
+
     def postprocess(self, ctrl_result: CtrlResult):
         ctrl_result.sort_d_list()
-        if self.dump_full:
-            if self.to_console:
-                main_logger.info(f"{ctrl_result.name:<14}: {ctrl_result}")
-            ctrl_result.dump(f"{self.output_path}/{ctrl_result.name}_full.json")
 
         # filtering
         ctrl_result.drop_size_limit(self.max_size)
@@ -105,44 +175,220 @@ class ExperimentHandler:
             ctrl_result.dump(f"{self.output_path}/{ctrl_result.name}.json")
 
         self.results.append(ctrl_result)
-        if os.path.exists("program_instance.asp"):
-            os.remove("program_instance.asp")
         return ctrl_result
 
-    def run_tools(self, filter_tools):
-        main_logger.info(f"Excluded genes: {self.exclude}")
+    def __getstate__(self):
+        # Boolean networks are not picklable; workers reload the preprocessed
+        # model from the cache directory instead of propagating it again.
+        state = dict(self.__dict__)
+        state["bn"] = type(self.bn)
+        state["org_bnet"] = type(self.org_bnet)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.bn = self.bn(self.bnet_file)
+        self.org_bnet = self.org_bnet(data=self.bnet_fname)
+
+    def job_key(self, toolcls) -> str:
+        """Content hash identifying the result of a tool on this experiment.
+
+        It covers the input model and setting, the run options that change the
+        result, and the tool version.
+        """
+        spec = {
+            "bnet": file_digest(self.bnet_fname),
+            "setting": file_digest(f"{self.input_path}/setting.json"),
+            "max_size": self.max_size,
+            "exclude_targets": self.exclude_targets,
+            "use_propagated": self.use_propagated,
+            "only_minimal": self.only_minimal,
+            "tool": toolcls.name,
+            "version": tool_version(toolcls),
+        }
+        if self.stops_early(toolcls):
+            # the full result only lists the controls up to max_size
+            spec["early_stop"] = True
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+    def stops_early(self, toolcls) -> bool:
+        """Whether a tool is asked to stop once its controls exceed `max_size`."""
+        return self.early_stop and getattr(toolcls, "can_stop_early", False)
+
+    def is_up_to_date(self, toolcls) -> bool:
+        """Whether a previous run of the tool finished with the same job key."""
+        try:
+            with open(f"{self.output_path}/{toolcls.name}_status.json") as _f:
+                status = json.load(_f)
+        except (OSError, ValueError):
+            return False
+        return (
+            status.get("status") == STATUS_OK
+            and status.get("key") == self.job_key(toolcls)
+            and os.path.isfile(f"{self.output_path}/{toolcls.name}.json")
+        )
+
+    def selected_tools(self, filter_tools):
+        tools = list()
         for toolcls in registered_tools():
             if filter_tools and toolcls.name not in filter_tools:
                 continue
+            if self.resume and self.is_up_to_date(toolcls):
+                main_logger.info(f"Skipping {toolcls.name}: results are up to date")
+                continue
+            tools.append(toolcls)
+        return tools
 
-            main_logger.info(f"Running {toolcls.name}")
-            args = (self.expid, self.cachedir) if toolcls.uses_cache else ()
+    def dump_status(self, toolcls, status: str, elapsed: float, message=""):
+        """Records whether a tool finished, next to its result file.
 
-            if toolcls.bn_type == "bnet_file":
-                bninp = self.bnet_file
-            elif toolcls.bn_type == "colomoto.BooleanNetwork":
-                bninp = self.bn
-            else:
-                raise TypeError(
-                    f"{toolcls.name}: Unknown BN type input {toolcls.bn_type}"
-                )
+        The status file doubles as the run manifest entry of the tool: its
+        job key lets `resume` skip results that are already up to date.
+        """
+        with open(f"{self.output_path}/{toolcls.name}_status.json", "w") as _f:
+            json.dump(
+                {
+                    "status": status,
+                    "time": round(elapsed, 3),
+                    "message": message,
+                    "key": self.job_key(toolcls),
+                },
+                _f,
+            )
+
+    def log_fname(self, toolcls) -> str:
+        """File keeping the console output of the last run of a tool."""
+        return f"{self.output_path}/{toolcls.name}.log"
+
+    def call_tool(self, toolcls, bninp, args) -> int:
+        """Runs a tool and streams its controls to its sink files.
+
+        Controls are consumed here, as a tool may produce them lazily: the
+        logged time covers the whole enumeration, not only the call of `run`
+        (lazy `run` methods are thus not decorated with `time_check`). Unless
+        `print_output` is set, the console output of the tool (and of the
+        binaries it runs) goes to its log file, which is removed if empty.
+        With `profile`, the run is profiled to `<output_path>/<tool>.prof`
+        (or `.html` for pyinstrument).
+        """
+        # tools declaring `parallel` can check candidates on a worker pool
+        kwargs = {"workers": self.tool_workers} if getattr(toolcls, "parallel", False) else {}
+        # tools declaring `can_stop_early` can stop beyond `max_size`
+        if self.stops_early(toolcls):
+            kwargs["early_stop"] = True
+        with contextlib.ExitStack() as stack:
+            if not self.print_output:
+                log_fname = self.log_fname(toolcls)
+                stack.callback(self._remove_empty_file, log_fname)
+                stack.enter_context(capture_console_output(log_fname, tail_bytes=0))
+            stack.enter_context(span("call_tool", PHASE_SOLVE))
+            profile_fname = f"{self.output_path}/{toolcls.name}" if self.profile else None
+            stack.enter_context(profiled(profile_fname, self.profile))
+            start = time.perf_counter()
+            count = self.collect(
+                toolcls,
+                toolcls.run(bninp, self.max_size, self.target, self.exclude, *args, **kwargs),
+            )
+            main_logger.info(f"{toolcls.name} found {count} controls in {time.perf_counter() - start:.3f}s")
+            return count
+
+    def _call_tool_and_free(self, toolcls, bninp, args) -> int:
+        """`call_tool` in a supervised subprocess, whose cache of the
+        experiment (e.g. temporary files) is freed before it exits."""
+        try:
+            return self.call_tool(toolcls, bninp, args)
+        finally:
+            if toolcls.uses_cache:
+                toolcls.free_experiment(self.expid)
+
+    @staticmethod
+    def _remove_empty_file(fname: str):
+        if os.path.isfile(fname) and os.path.getsize(fname) == 0:
+            os.remove(fname)
+
+    def run_tool(self, toolcls) -> CtrlResult | None:
+        """Runs a single tool and post-processes its result.
+
+        The controls of the tool are streamed to disk as they are produced (see
+        `collect`) and read back once the tool has finished.
+
+        If a timeout or a memory limit is set, the tool runs in a supervised
+        subprocess that is killed when exceeding its budget. The cache of the
+        experiment built by the tool is then freed in the subprocess when the
+        tool returns, but on-disk caches are kept.
+        """
+        with trace_tags(instance=self.name, tool=toolcls.name), span("run_tool", PHASE_TOOL):
+            return self._run_tool(toolcls)
+
+    def _run_tool(self, toolcls) -> CtrlResult | None:
+        main_logger.info(f"Running {toolcls.name}")
+        args = (self.expid, self.cachedir) if toolcls.uses_cache else ()
+
+        if toolcls.bn_type == "bnet_file":
+            bninp = self.bnet_file
+        elif toolcls.bn_type == "colomoto.BooleanNetwork":
+            bninp = self.bn
+        else:
+            raise TypeError(
+                f"{toolcls.name}: Unknown BN type input {toolcls.bn_type}"
+            )
+
+        start = time.perf_counter()
+        if self.timeout is None and self.max_rss is None:
             try:
-                if not self.print_output:
-                    with suppress_console_output():
-                        res = toolcls.run(
-                            bninp, self.max_size, self.target, self.exclude, *args
-                        )
-                else:
-                    res = toolcls.run(
-                        bninp, self.max_size, self.target, self.exclude, *args
-                    )
-                res = CtrlResult(toolcls.name, res)
-                self.postprocess(res)
+                status, res = STATUS_OK, self.call_tool(toolcls, bninp, args)
+            except MemoryError as e:
+                status, res = STATUS_OOM, f"MemoryError: {e}"
             except Exception as e:
-                main_logger.error(f"Error running {toolcls.name}: {e}")
-                continue
+                status, res = STATUS_ERROR, f"{e}"
+        else:
+            status, res = run_supervised(
+                self._call_tool_and_free,
+                (toolcls, bninp, args),
+                timeout=self.timeout,
+                max_rss=None if self.max_rss is None else int(self.max_rss * 2**20),
+            )
+        elapsed = time.perf_counter() - start
+
+        if status != STATUS_OK:
+            main_logger.error(f"Error running {toolcls.name} ({status}): {res}")
+            if os.path.isfile(self.sink_fname(toolcls)):
+                main_logger.info(f"Partial result of {toolcls.name} kept in {self.sink_fname(toolcls)}")
+            if os.path.isfile(self.log_fname(toolcls)):
+                main_logger.info(f"Console output of {toolcls.name} kept in {self.log_fname(toolcls)}")
+            self.dump_status(toolcls, status, elapsed, res)
+            return None
+        # the ok status marks the result as up to date (see `is_up_to_date`),
+        # so it is only written once the result file is
+        try:
+            result = self.finalize(toolcls)
+        except Exception as e:
+            main_logger.error(f"Error running {toolcls.name}: {e}")
+            self.dump_status(toolcls, STATUS_ERROR, elapsed, f"{e}")
+            return None
+        self.dump_status(toolcls, status, elapsed)
+        return result
+
+    def run_tools(self, filter_tools):
+        main_logger.info(f"Excluded genes: {self.exclude}")
+        for toolcls in self.selected_tools(filter_tools):
+            self.run_tool(toolcls)
 
         for toolcls in registered_tools():
             if toolcls.uses_cache:
                 main_logger.info(f"Cleaning cache for {toolcls.name}")
                 toolcls.free_experiment(self.expid)
+
+
+def run_tool_job(exp: ExperimentHandler, tool_name: str) -> str:
+    """Run a single (instance, tool) job of a sweep, typically in a worker process.
+
+    Results are written to the output folder of `exp` as in `run_tools`.
+    """
+    toolcls = get_tool(tool_name)
+    try:
+        exp.run_tool(toolcls)
+    finally:
+        if toolcls.uses_cache:
+            toolcls.free_experiment(exp.expid)
+    return tool_name
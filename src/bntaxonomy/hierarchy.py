@@ -1,12 +1,15 @@
 from collections import defaultdict
-import json
 import os
 import networkx as nx
-from itertools import combinations, product
+import numpy as np
+from itertools import combinations
 from colomoto.minibn import BooleanNetwork
 
 
-from bntaxonomy.utils.control import CtrlResult, suppress_console_output
+from bntaxonomy.store import ResultStore, read_result_folder
+from bntaxonomy.utils.console import suppress_console_output
+from bntaxonomy.utils.control import CtrlResult
+from bntaxonomy.utils.process import STATUS_OK
 import bntaxonomy.utils.graph as graph_utils
 
 
@@ -16,11 +19,19 @@ class SingleInputSummary:
         results: list[CtrlResult],
         name: str = "SingleInputSummary",
         bn: BooleanNetwork | None = None,
+        status: dict[str, str] | None = None,
+        bn_nodes: list[str] | None = None,
     ):
         self.name = name
         self.results = results
         self.G = nx.DiGraph()
         self.bn = bn
+        if bn_nodes is None and bn is not None:
+            bn_nodes = list(bn.keys())
+        self.bn_nodes = bn_nodes
+        # tool name -> run status (e.g., "ok", "timeout", "oom"), if recorded
+        self.status = status or dict()
+        self._reach = None
 
         for r1, r2 in combinations(self.results, 2):
             if r1.is_stronger_than(r2):
@@ -28,6 +39,40 @@ class SingleInputSummary:
             if r2.is_stronger_than(r1):
                 self.G.add_edge(r1.name, r2.name)
 
+    def add_result(self, result: CtrlResult):
+        """Adds (or replaces) the result of a tool, comparing it only to the others."""
+        self.remove_result(result.name)
+        for other in self.results:
+            if result.is_stronger_than(other):
+                self.G.add_edge(other.name, result.name)
+            if other.is_stronger_than(result):
+                self.G.add_edge(result.name, other.name)
+        self.results.append(result)
+        self._reach = None
+
+    def remove_result(self, name: str):
+        self.results = [r for r in self.results if r.name != name]
+        if self.G.has_node(name):
+            self.G.remove_node(name)
+        self._reach = None
+
+    def reachability(self) -> tuple[list[str], np.ndarray]:
+        """Transitive closure of `G`, computed once.
+
+        Returns:
+            tuple[list[str], np.ndarray]: the sorted nodes of `G` and the boolean
+            matrix `R` where `R[i, j]` iff there is a path from node i to node j.
+        """
+        if self._reach is None:
+            nodes = sorted(self.G.nodes)
+            R = np.eye(len(nodes), dtype=bool)
+            if nodes:
+                R |= nx.to_numpy_array(self.G, nodelist=nodes, weight=None) > 0
+            for k in range(len(nodes)):
+                R |= R[:, k, None] & R[None, k, :]
+            self._reach = (nodes, R)
+        return self._reach
+
     def save(self, fname: str):
         with suppress_console_output():
             dot_fname = f"{fname}.dot"
@@ -38,20 +83,21 @@ class SingleInputSummary:
             graph_utils.cluster_cycles(tred_fname, tred_fname)
             graph_utils.export_dot_png(tred_fname, f"{fname}_tred.png")
 
+    def unfinished_tools(self) -> list[str]:
+        """Tools that did not finish (timeout, out of memory, error).
+
+        Unlike tools returning no control, they have no result in `results`.
+        """
+        return sorted(k for k, v in self.status.items() if v != STATUS_OK)
+
     @staticmethod
     def from_folder(opath: str, name: str = "", bn: BooleanNetwork | None = None):
-        files = [
-            fname
-            for fname in os.listdir(opath)
-            if fname.endswith(".json") and not fname.endswith("_full.json")
-        ]
-        sol_list = [
-            CtrlResult(fname[:-5], json.load(open(f"{opath}/{fname}")))
-            for fname in files
-        ]
+        results, status = read_result_folder(opath)
+        sol_list = [CtrlResult(tool, d_list) for tool, d_list in results.items()]
         if not name:
             name = opath.split("/")[-1]
-        return SingleInputSummary(sol_list, name, bn)
+        status = {tool: st["status"] for tool, st in status.items()}
+        return SingleInputSummary(sol_list, name, bn, status)
 
 
 class MultiInputSummary:
@@ -62,26 +108,82 @@ class MultiInputSummary:
         exp_groups: dict[str, list[SingleInputSummary]] = dict(),
     ):
         self.name = name
-        self.exp_list = exp_list
-        self.exp_groups = exp_groups
+        self.exp_list = list(exp_list)
+        self.exp_groups = {group: list(exps) for group, exps in exp_groups.items()}
+        # self._ce[e, i, j]: tools i and j are in the graph of self.exp_list[e],
+        # but there is no path from i to j (i.e., the instance is a counterexample)
+        self.nodes: list[str] = list()
+        self._ce = np.zeros((0, 0, 0), dtype=bool)
+        self._refresh()
+
+    def _counterexample_mask(self, exp: SingleInputSummary) -> np.ndarray:
+        nodes, R = exp.reachability()
+        idx = [self._node_index[node] for node in nodes]
+        mask = np.zeros((len(self.nodes), len(self.nodes)), dtype=bool)
+        mask[np.ix_(idx, idx)] = ~R
+        return mask
+
+    def _refresh(self, changed: list[int] | None = None):
+        """Updates the counterexample masks and rebuilds `G` and `ce_G` from them.
+
+        Only the masks of the instances at the indices `changed` are recomputed,
+        unless the set of tools has changed.
+        """
+        nodes = sorted(set(node for exp in self.exp_list for node in exp.G.nodes))
+        if nodes != self.nodes or changed is None:
+            self.nodes = nodes
+            self._node_index = {node: i for i, node in enumerate(nodes)}
+            self._ce = np.zeros((len(self.exp_list), len(nodes), len(nodes)), dtype=bool)
+            changed = range(len(self.exp_list))
+        for e in changed:
+            self._ce[e] = self._counterexample_mask(self.exp_list[e])
+
         self.G, self.ce_G = nx.DiGraph(), nx.DiGraph()
-        nodes = set(node for exp in self.exp_list for node in exp.G.nodes)
-        self.G.add_nodes_from(nodes)
-        self.ce_G.add_nodes_from(nodes)
-        for v1, v2 in product(nodes, nodes):
-            if v1 == v2:
-                continue
-            ce_exp_list = [
-                exp
-                for exp in self.exp_list
-                if (G := exp.G).has_node(v1)
-                and G.has_node(v2)
-                and (not nx.has_path(G, v1, v2))
-            ]
-            if ce_exp_list:
-                self.ce_G.add_edge(v1, v2, counterexamples=ce_exp_list)
-            else:
-                self.G.add_edge(v1, v2)
+        self.G.add_nodes_from(self.nodes)
+        self.ce_G.add_nodes_from(self.nodes)
+        has_ce = self._ce.any(axis=0)
+        for i, j in zip(*np.nonzero(has_ce)):
+            ce_exp_list = [self.exp_list[e] for e in np.nonzero(self._ce[:, i, j])[0]]
+            self.ce_G.add_edge(self.nodes[i], self.nodes[j], counterexamples=ce_exp_list)
+        np.fill_diagonal(has_ce, True)
+        for i, j in zip(*np.nonzero(~has_ce)):
+            self.G.add_edge(self.nodes[i], self.nodes[j])
+
+    def get_exp(self, exp_name: str) -> SingleInputSummary:
+        for exp in self.exp_list:
+            if exp.name == exp_name:
+                return exp
+        raise KeyError(exp_name)
+
+    def add_exp(self, exp: SingleInputSummary, group: str | None = None):
+        self.exp_list.append(exp)
+        if group is not None:
+            self.exp_groups.setdefault(group, []).append(exp)
+        self._ce = np.concatenate(
+            [self._ce, np.zeros((1, len(self.nodes), len(self.nodes)), dtype=bool)]
+        )
+        self._refresh([len(self.exp_list) - 1])
+
+    def remove_exp(self, exp_name: str):
+        e = self.exp_list.index(exp := self.get_exp(exp_name))
+        del self.exp_list[e]
+        for exps in self.exp_groups.values():
+            if exp in exps:
+                exps.remove(exp)
+        self._ce = np.delete(self._ce, e, axis=0)
+        self._refresh([])
+
+    def add_tool_result(self, exp_name: str, result: CtrlResult):
+        """Adds (or replaces) the result of a tool on one instance."""
+        exp = self.get_exp(exp_name)
+        exp.add_result(result)
+        self._refresh([self.exp_list.index(exp)])
+
+    def remove_tool(self, tool_name: str):
+        """Removes the results of a tool from every instance."""
+        for exp in self.exp_list:
+            exp.remove_result(tool_name)
+        self._refresh()
 
     @staticmethod
     def from_folders(folders: list[str], name: str = "Hierarchy"):
@@ -122,6 +224,32 @@ class MultiInputSummary:
             exp_list.append(input_summary)
         return MultiInputSummary(exp_list, name, exp_groups)
 
+    @staticmethod
+    def from_store(
+        store: ResultStore,
+        groups: list[str] | None = None,
+        instances: list[str] | None = None,
+        name: str = "Hierarchy",
+        tools: list[str] | None = None,
+    ):
+        """Loads the instances of a result store (see `bntaxonomy.store`) at once.
+
+        Unlike `from_inst_groups`, the networks are not loaded: only their
+        nodes are available, as `bn_nodes`.
+        """
+        exp_groups = defaultdict(list)
+        exp_list = []
+        for (_, exp_name), data in store.read(groups, instances, tools).items():
+            input_summary = SingleInputSummary(
+                [CtrlResult(tool, d_list) for tool, d_list in data["results"].items()],
+                exp_name,
+                status=data["status"],
+                bn_nodes=data["nodes"],
+            )
+            exp_groups[data["group"]].append(input_summary)
+            exp_list.append(input_summary)
+        return MultiInputSummary(exp_list, name, exp_groups)
+
     def save(self, fname: str):
         with suppress_console_output():
             dot_fname = f"{fname}.dot"
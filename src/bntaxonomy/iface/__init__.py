@@ -1,34 +1,170 @@
 
+import functools
 import glob
+import importlib
+import importlib.metadata
+import importlib.util
 import os
 from bntaxonomy.utils.log import main_logger
+from bntaxonomy.iface._manifest import TOOL_MANIFEST
+
+_TOOL_ATTRS = ("uses_cache", "uses_primes", "bn_type", "parallel", "package", "version")
+
+def _tool_attrs(toolcls) -> dict:
+    attrs = {attr: getattr(toolcls, attr, None) for attr in _TOOL_ATTRS}
+    attrs["uses_cache"] = bool(attrs["uses_cache"])
+    attrs["uses_primes"] = bool(attrs["uses_primes"])
+    attrs["parallel"] = bool(attrs["parallel"])
+    return attrs
+
+class LazyTool:
+    """Registry entry of a tool, standing for its class until it is needed.
+
+    The scheduling attributes (`name`, `uses_cache`, `uses_primes`, `bn_type`,
+    `parallel`, `package`, `version`) come from the manifest, so that listing and selecting
+    tools does not import their backends. The interface module is imported on
+    the first access to any other attribute, e.g. `run`.
+    """
+
+    def __init__(self, name: str, module: str, classname: str, **attrs):
+        self.name = name
+        self.module = module
+        self.classname = classname
+        self.uses_cache = attrs.get("uses_cache", False)
+        self.uses_primes = attrs.get("uses_primes", False)
+        self.bn_type = attrs.get("bn_type")
+        self.parallel = attrs.get("parallel", False)
+        self.package = attrs.get("package")
+        self.version = attrs.get("version")
+        self._cls = None
+
+    @classmethod
+    def from_class(cls, toolcls):
+        attrs = _tool_attrs(toolcls)
+        entry = cls(toolcls.name, toolcls.__module__, toolcls.__name__, **attrs)
+        entry._cls = toolcls
+        return entry
+
+    @property
+    def loaded(self) -> bool:
+        return self._cls is not None
+
+    def load(self):
+        """Imports the interface module of the tool and returns its class."""
+        if self._cls is None:
+            importlib.import_module(self.module)
+            if self._cls is None:
+                raise ImportError(f"{self.module} does not register the tool {self.name}")
+        return self._cls
+
+    def bind(self, toolcls):
+        for attr, value in _tool_attrs(toolcls).items():
+            if value != getattr(self, attr):
+                main_logger.warning(
+                    f"{self.name}: '{attr}' of {toolcls.__name__} differs from the tool manifest"
+                )
+                setattr(self, attr, value)
+        self._cls = toolcls
+
+    def free_experiment(self, expid: int):
+        # a tool that was never loaded holds no cached data
+        if self._cls is not None:
+            self._cls.free_experiment(expid)
+
+    def __getattr__(self, attr):
+        # only reached for attributes that are not in the manifest
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __reduce__(self):
+        return (get_tool, (self.name,))
+
+    def __repr__(self):
+        return f"<tool {self.name} ({self.module}.{self.classname})>"
+
+@functools.cache
+def module_available(module: str) -> bool:
+    """Whether a top-level module is installed, without importing it."""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+def _manifest_tools():
+    for module, spec in TOOL_MANIFEST.items():
+        if not all(module_available(m) for m in spec["requires"]):
+            continue
+        for tool in spec["tools"]:
+            attrs = {k: v for k, v in tool.items() if k not in ("name", "cls")}
+            yield LazyTool(tool["name"], f"bntaxonomy.iface.{module}", tool["cls"], **attrs)
 
 def load_tools():
+    """Fills the registry.
+
+    Tools of the manifest are registered without importing their backends,
+    and only if the modules they require are installed. Other interface
+    modules of the folder (e.g. new tools) are imported to register theirs.
+    """
     basedirs = [os.path.dirname(__file__)]
     __TOOLS.clear()
+    for entry in _manifest_tools():
+        __TOOLS[entry.name] = entry
     for basedir in basedirs:
-        for toolfile in glob.glob(f"{basedir}/*.py"):
+        for toolfile in sorted(glob.glob(f"{basedir}/*.py")):
             toolname = os.path.basename(toolfile)[:-3]
-            if toolname[0] == "_":
+            if toolname[0] == "_" or toolname in TOOL_MANIFEST:
                 continue
             try:
                 __import__(f"bntaxonomy.iface.{toolname}")
             except Exception as e:
                 main_logger.warning(f"Fail to load tool '{toolname}' ({e})")
 
-__TOOLS = []
+__TOOLS: dict[str, LazyTool] = dict()
 
 def tool_names():
-    return [t.name for t in __TOOLS]
+    return list(__TOOLS)
 
 def registered_tools():
-    return iter(__TOOLS)
+    return iter(list(__TOOLS.values()))
+
+def get_tool(name: str) -> LazyTool:
+    """Registry entry of the tool `name`, filling the registry if needed."""
+    if name not in __TOOLS:
+        load_tools()
+    return __TOOLS[name]
+
+def tool_version(toolcls) -> str:
+    """Version of the software behind a tool, from its `version` attribute or
+    from the installed distribution named by its `package` attribute."""
+    if getattr(toolcls, "version", None):
+        return toolcls.version
+    if getattr(toolcls, "package", None):
+        try:
+            return importlib.metadata.version(toolcls.package)
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return ""
 
 def register_tool(toolcls):
+    """Registers a tool class.
+
+    The `run` method of a tool returns its controls, as dicts from node names
+    to values, in any iterable. A generator lets `ExperimentHandler` filter
+    the controls and stream them to disk as they are found, instead of
+    holding the whole enumeration in memory.
+
+    Tools of the bundled interface modules must also be listed in
+    `_manifest.py`, which lets the registry schedule them without importing
+    their module.
+    """
     if not hasattr(toolcls, "uses_cache"):
         toolcls.uses_cache = False
     if not hasattr(toolcls, "name"):
         toolcls.name = toolcls.__name__
-    __TOOLS.append(toolcls)
+    if toolcls.name in __TOOLS:
+        __TOOLS[toolcls.name].bind(toolcls)
+    else:
+        __TOOLS[toolcls.name] = LazyTool.from_class(toolcls)
     main_logger.info(f"Registered tool {toolcls.name}")
     return toolcls
@@ -0,0 +1,150 @@
+"""Metadata of the bundled tools, readable without importing their backends.
+
+Each interface module lists the top-level modules it needs (`requires`) and
+the tools it registers, with the attributes used to schedule them. Keep the
+entries in sync with the tool classes: `register_tool` warns when a class
+disagrees with its entry.
+"""
+
+TOOL_MANIFEST = {
+    "actonet": {
+        "requires": ["actonet", "algorecell_types"],
+        "tools": [
+            {
+                "name": "ActoNet",
+                "cls": "ActoNetFP",
+                "bn_type": "colomoto.BooleanNetwork",
+                "package": "pyactonet",
+            },
+        ],
+    },
+    "bonesis": {
+        "requires": ["bonesis", "colomoto"],
+        "tools": [
+            {
+                "name": "BoNesis[FP]",
+                "cls": "BoNesisFixedPoints",
+                "bn_type": "colomoto.BooleanNetwork",
+                "package": "bonesis",
+            },
+            {
+                "name": "BoNesis[MTS]",
+                "cls": "BoNesisTrapSpaces",
+                "bn_type": "colomoto.BooleanNetwork",
+                "package": "bonesis",
+            },
+        ],
+    },
+    "cabean": {
+        "requires": ["cabean", "colomoto"],
+        "tools": [
+            {
+                "name": f"CABEAN[{method}]",
+                "cls": f"CABEAN_{method}",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "parallel": True,
+                "version": "2.0.1",
+            }
+            for method in ("ITC", "TTC", "PTC")
+        ],
+    },
+    "caspo": {
+        "requires": ["caspo_control", "colomoto", "algorecell_types"],
+        "tools": [
+            {
+                "name": "Caspo",
+                "cls": "CaspoVPTS",
+                "bn_type": "colomoto.BooleanNetwork",
+                "package": "caspo-control",
+            },
+        ],
+    },
+    # helpers for the preprocessing of instances, no tool
+    "mpbn": {"requires": ["mpbn", "colomoto"], "tools": []},
+    "optboolnet": {
+        "requires": ["optboolnet"],
+        "tools": [
+            {
+                "name": "optbn[FP]",
+                "cls": "OptBoolNetFixPoints",
+                "bn_type": "colomoto.BooleanNetwork",
+                "package": "optboolnet",
+            },
+            {
+                "name": "optbn[SA]",
+                "cls": "OptBoolNetSyncAttr",
+                "bn_type": "colomoto.BooleanNetwork",
+                "package": "optboolnet",
+            },
+        ],
+    },
+    "pyboolnet": {
+        "requires": ["pyboolnet", "clingo"],
+        "tools": [
+            {
+                "name": "PBN[SA]",
+                "cls": "PyBoolNet_ModelChecking_SA",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "uses_primes": True,
+                "parallel": True,
+                "package": "pyboolnet",
+            },
+            {
+                "name": "PBN[ASA]",
+                "cls": "PyBoolNet_ModelChecking_ASA",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "uses_primes": True,
+                "parallel": True,
+                "package": "pyboolnet",
+            },
+            {
+                "name": "PBN[percolation]",
+                "cls": "PyBoolNet_Percolation",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "uses_primes": True,
+                "package": "pyboolnet",
+            },
+            {
+                "name": "PBN[trap_spaces]",
+                "cls": "PyBoolNet_Trapspaces",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "uses_primes": True,
+                "package": "pyboolnet",
+            },
+        ],
+    },
+    "stablemotif": {
+        "requires": ["pystablemotifs", "pyboolnet"],
+        "tools": [
+            {
+                "name": "SM[brute-force]",
+                "cls": "SM_BruteForce",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "uses_primes": True,
+                "package": "pystablemotifs",
+            },
+            {
+                "name": "SM[minimal]",
+                "cls": "SM_TrapSpace_Minimal",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "uses_primes": True,
+                "package": "pystablemotifs",
+            },
+            {
+                "name": "SM[internal]",
+                "cls": "SM_TrapSpace_Internal",
+                "bn_type": "bnet_file",
+                "uses_cache": True,
+                "uses_primes": True,
+                "package": "pystablemotifs",
+            },
+        ],
+    },
+}
@@ -1,6 +1,6 @@
 import functools
 from bntaxonomy.iface import register_tool
-from bntaxonomy.utils.control import refine_pert
+from bntaxonomy.utils.control import iter_perturbations
 from bntaxonomy.utils.log import time_check
 
 from actonet import ActoNet
@@ -14,6 +14,7 @@ class myActoNet(ActoNet):
 @register_tool
 class ActoNetFP:
     name = "ActoNet"
+    package = "pyactonet"
     bn_type = "colomoto.BooleanNetwork"
 
     @time_check
@@ -21,4 +22,4 @@ class ActoNetFP:
     def run(bn, max_size, target, exclude, inputs={}):
         a = myActoNet(bn, inputs)
         r = a.reprogramming_fixpoints(target, maxsize=max_size)
-        return refine_pert(r)
+        return iter_perturbations(r)
@@ -1,5 +1,4 @@
 from bntaxonomy.iface import register_tool
-from bntaxonomy.utils.log import time_check
 
 import bonesis
 from colomoto.minibn import BooleanNetwork
@@ -11,19 +10,19 @@ from bonesis.reprogramming import (
 @register_tool
 class BoNesisFixedPoints:
     name = "BoNesis[FP]"
+    package = "bonesis"
     bn_type = "colomoto.BooleanNetwork"
 
-    @time_check
     @staticmethod
     def run(bn, max_size, target, exclude):
-        return list(marker_reprogramming_fixpoints(bn, target, max_size, at_least_one=False))
+        return marker_reprogramming_fixpoints(bn, target, max_size, at_least_one=False)
 
 @register_tool
 class BoNesisTrapSpaces:
     name = "BoNesis[MTS]"
+    package = "bonesis"
     bn_type = "colomoto.BooleanNetwork"
 
-    @time_check
     @staticmethod
     def run(bn, max_size, target, exclude):
-        return list(marker_reprogramming(bn, target, max_size))
+        return marker_reprogramming(bn, target, max_size)
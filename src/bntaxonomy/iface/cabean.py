@@ -4,16 +4,26 @@ All rights to the CABEAN tool and its outputs belong to the original authors.
 Su, C., & Pang, J. (2021). Cabean 2.0: Efficient and Efficacious Control of Asynchronous Boolean Networks. In M. Huisman, C. Păsăreanu, & N. Zhan (Eds.), Formal Methods (pp. 581–598). Springer International Publishing. https://doi.org/10.1007/978-3-030-90870-6_31
 """
 
+import contextlib
+import hashlib
 import json
 import os
+import shutil
+import signal
 import subprocess
 import tempfile
+from typing import Iterable, Iterator
+
+import numpy as np
 from colomoto.minibn import BooleanNetwork
 from cabean import CabeanInstance, CabeanIface
-from cabean.iface import CabeanResult
 from colomoto.types import PartialState
 
+from bntaxonomy.utils.bincache import pack_states, read_bincache, unpack_states, write_bincache
+from bntaxonomy.utils.cache import atomic_write, file_digest
+from bntaxonomy.utils.console import console_output_file
 from bntaxonomy.utils.log import time_check, main_logger
+from bntaxonomy.utils.trace import PHASE_ATTRACTORS
 from bntaxonomy.iface import register_tool
 
 
@@ -21,8 +31,10 @@ from bntaxonomy.iface import register_tool
 # TODO: make the path valid after installation
 cabean_path = f"{os.path.dirname(os.path.abspath(__file__))}/../dep/cabean_2.0.0"
 
-CABEAN_OUT_MEMORY = "OUT_OF_MEMORY"
-ATTR_JSON_FILE = "cabean_attractors.json"
+# exit of the CABEAN binary when running out of memory: a message of CUDD or
+# of the C++ runtime, or a kill by the kernel OOM killer
+CABEAN_OOM_MESSAGES = ("out of memory", "bad_alloc", "cannot allocate memory")
+ATTR_BIN_FILE = "cabean_attractors.bin"
 
 # --- GLOBAL IN-MEMORY CACHE ---
 cache = dict()  # expid -> CabeanInstancePrecomputed
@@ -38,7 +50,7 @@ class CabeanInstancePrecomputed(CabeanInstance):
         self.iface = CabeanIface(bn, init=init)
         # NOTE: Do not compute attractors here; we load/compute via cache helpers.
 
-    @time_check
+    @time_check(phase=PHASE_ATTRACTORS)
     def compute_attractors(self):
         self.attractors = self.iface.attractors()
 
@@ -50,20 +62,31 @@ class CabeanInstancePrecomputed(CabeanInstance):
 # Cache helpers
 # -------------------------------
 def _cabean_cache_file(cachedir: str) -> str:
-    return f"{cachedir}/{ATTR_JSON_FILE}" if cachedir else ""
+    return f"{cachedir}/{ATTR_BIN_FILE}" if cachedir else ""
+
 
+def _attractor_states(attr) -> list:
+    # an attractor is a single (partial) state or a list of states
+    return [attr] if isinstance(attr, dict) else list(attr)
 
-def _try_load_attractors(cachedir: str):
+
+def _try_load_attractors(cachedir: str, key: str):
     """
-    Try to load precomputed attractors from JSON cache.
-    Returns None if missing or failed.
+    Try to load precomputed attractors from the binary cache.
+    Returns None if missing, failed or computed from another model.
     """
     cache_file = _cabean_cache_file(cachedir)
-    if not cache_file or not os.path.isfile(cache_file):
-        return None
     try:
-        with open(cache_file) as _f:
-            attrs = json.load(_f)
+        content = read_bincache(cache_file, "attrs", key)
+        if content is None:
+            return None
+        meta, arrays = content
+        states = unpack_states(arrays["value"], arrays["fixed"], meta["nodes"], free="*")
+        attrs = dict()
+        for num, state in zip(arrays["attractor"].tolist(), states):
+            attrs.setdefault(num, []).append(state)
+        for num in meta["single"]:
+            attrs[num] = attrs[num][0]
         main_logger.info("Loaded precomputed CABEAN attractors successfully")
         return attrs
     except Exception as e:
@@ -71,71 +94,121 @@ def _try_load_attractors(cachedir: str):
         return None
 
 
-def _save_attractors(attrs, cachedir: str):
+def _save_attractors(attrs, nodes: list[str], cachedir: str, key: str):
     """
-    Persist attractors to JSON cache (best-effort).
+    Persist attractors to the binary cache (best-effort).
     """
     cache_file = _cabean_cache_file(cachedir)
     if not cache_file:
         return
     try:
-        with open(cache_file, "w") as _f:
-            json.dump(attrs, _f)
+        nums, states = [], []
+        for num, attr in attrs.items():
+            attr_states = _attractor_states(attr)
+            nums.extend([num] * len(attr_states))
+            states.extend(attr_states)
+        value, fixed = pack_states(states, nodes)
+        meta = {
+            "nodes": nodes,
+            "single": [num for num, attr in attrs.items() if isinstance(attr, dict)],
+        }
+        arrays = {
+            "attractor": np.array(nums, dtype=np.int32),
+            "value": value,
+            "fixed": fixed,
+        }
+        write_bincache(cache_file, "attrs", key, meta, arrays)
         main_logger.info("Wrote CABEAN attractors cache")
     except Exception as e:
         main_logger.info(f"Writing CABEAN attractors cache failed: {e}")
 
 
-@time_check
+def _is_out_of_memory(e: subprocess.CalledProcessError) -> bool:
+    if e.returncode == -signal.SIGKILL:
+        return True
+    output = b"".join(x for x in (e.stderr, e.output) if x).decode(errors="replace").lower()
+    return any(msg in output for msg in CABEAN_OOM_MESSAGES)
+
+
+@time_check(phase=PHASE_ATTRACTORS)
 def make_cabean_iface(
-    bn: BooleanNetwork, cachedir: str = ""
-) -> CabeanInstancePrecomputed | str:
+    bn: BooleanNetwork, cachedir: str = "", key: str = ""
+) -> CabeanInstancePrecomputed:
     """
     Create a CabeanInstancePrecomputed and ensure `attractors` are loaded:
-      - If cached JSON exists, load and attach.
+      - If a cache of the same model (of digest `key`) exists, load and attach.
       - Otherwise compute once and write to cache.
-    Returns CABEAN_OUT_MEMORY on failure (kept for compatibility).
+    Raises MemoryError if CABEAN runs out of memory; other failures (e.g. a
+    missing binary) propagate as they are.
     """
     main_logger.info("Loading CABEAN and preparing attractors (with cache)")
-    try:
-        inst = CabeanInstancePrecomputed(bn)
-        attrs = _try_load_attractors(cachedir)
-        if attrs is not None:
-            inst.load_precomputed_attr(attrs)
-        else:
+    inst = CabeanInstancePrecomputed(bn)
+    key = key or file_digest(bn)
+    attrs = _try_load_attractors(cachedir, key)
+    if attrs is not None:
+        inst.load_precomputed_attr(attrs)
+    else:
+        try:
             inst.compute_attractors()
-            # Ensure JSON-serializable; most CabeanIface outputs are dict/list of dicts.
-            _save_attractors(inst.attractors, cachedir)
-        return inst
-    except Exception as e:
-        main_logger.info(f"Error loading CABEAN: {e}")
-        return CABEAN_OUT_MEMORY
+        except subprocess.CalledProcessError as e:
+            if _is_out_of_memory(e):
+                # reported as an unfinished run rather than an empty result
+                raise MemoryError(f"CABEAN could not compute the attractors: {e}") from e
+            raise
+        _save_attractors(inst.attractors, inst.iface.ordered_nodes, cachedir, key)
+    return inst
+
+
+CABEAN_METHODS = ("ITC", "TTC", "PTC")
 
 
-def make_cabean_tempfiles(cabean_obj: CabeanInstance, target: dict[str, int]):
-    fd, cabean_bn_fname = tempfile.mkstemp(suffix=".ispl", prefix="cabean_bn")
-    os.close(fd)
+def cabean_ispl_file(cabean_obj: CabeanInstancePrecomputed, cachedir: str, key: str) -> str:
+    """
+    ISPL model of a CABEAN instance, written once per model in `cachedir`
+    (named after the model hash `key`) and shared by all control methods.
+    Without `cachedir`, a temporary file is written once per instance and
+    removed with it (see `free_cabean_instance`).
+    """
+    if getattr(cabean_obj, "ispl_fname", None):
+        return cabean_obj.ispl_fname
+    if cachedir:
+        fname = f"{cachedir}/cabean_{key[:16]}.ispl"
+        if not os.path.isfile(fname):
+            with atomic_write(fname) as _f:
+                cabean_obj.iface.write_ispl(_f)
+    else:
+        fd, fname = tempfile.mkstemp(suffix=".ispl", prefix="cabean_bn")
+        with os.fdopen(fd, "w") as _f:
+            cabean_obj.iface.write_ispl(_f)
+        cabean_obj.ispl_tmpfile = fname
+    cabean_obj.ispl_fname = fname
+    return fname
+
+
+def free_cabean_instance(cabean_obj: CabeanInstancePrecomputed):
+    tmp_fname = getattr(cabean_obj, "ispl_tmpfile", None)
+    if tmp_fname and os.path.exists(tmp_fname):
+        os.remove(tmp_fname)
+    results_dir = getattr(cabean_obj, "results_dir", None)
+    if results_dir:
+        shutil.rmtree(results_dir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def cabean_target_file(target: dict[str, int]):
     fd, cabean_target_fname = tempfile.mkstemp(suffix=".txt", prefix="cabean_target")
-    os.close(fd)
-    with open(cabean_target_fname, "w") as _f:
-        _f.write("node, value\n")
-        for k, v in target.items():
-            _f.write(f"{k},{v}\n")
-    with open(cabean_bn_fname, "w") as _f:
-        cabean_obj.iface.write_ispl(_f)
-    return cabean_target_fname, cabean_bn_fname
+    try:
+        with os.fdopen(fd, "w") as _f:
+            _f.write("node, value\n")
+            for k, v in target.items():
+                _f.write(f"{k},{v}\n")
+        yield cabean_target_fname
+    finally:
+        os.remove(cabean_target_fname)
 
 
-@time_check
-def ctrl_target_control_iface(
-    cabean_obj: CabeanInstance,
-    target: dict[str, int],
-    method: str,
-    _debug=False,
-    **kwargs,
-):
-    cabean_target_fname, cabean_bn_fname = make_cabean_tempfiles(cabean_obj, target)
-    cmd = [
+def cabean_control_cmd(method: str, cabean_target_fname: str, cabean_bn_fname: str) -> list[str]:
+    return [
         cabean_path,
         "-compositional",
         "2",
@@ -145,51 +218,161 @@ def ctrl_target_control_iface(
         cabean_target_fname,
         cabean_bn_fname,
     ]
-    output = subprocess.run(cmd, capture_output=True)
-    result = CabeanResult(cabean_obj.iface, output.stdout.decode())
-    ctrl_list = []
-    line_iter = iter(result.lines)
-    line = next(line_iter, "")
-    while not "DECOMP" in line:
-        line = next(line_iter, "")
 
-    for line in line_iter:
-        line: str
 
-        if line.startswith("There is only one attractor."):
-            # Trivial solution if the target already satisfies a phenotype
-            # Otherwise, the phenotype is not satisfied
-            is_phenotype = True
-            for state in result.attractors.values():
-                if isinstance(state, list):
-                    states = state
-                elif isinstance(state, dict):
-                    states = [state]
-                else:
-                    raise ValueError(f"Unknown type {type(state)}")
-                for state in states:
-                    for k, v in target.items():
-                        if state[k] != v:
-                            is_phenotype = False
-            if is_phenotype:
-                ctrl_list.append(dict())
-            if _debug:
-                main_logger.info(line)
-                main_logger.info(cabean_obj.attractors)
-                main_logger.info(f"phenotype: {target}, {is_phenotype}")
+def _parse_controlset(line: str) -> dict[str, int]:
+    p = dict()
+    for c in line.strip().split():
+        if "=" in c:
+            node, value = c.split("=")
+            p[node] = int(value)
+    return p
+
+
+def iter_target_control(
+    cabean_obj: CabeanInstance,
+    target: dict[str, int],
+    lines: Iterable[str],
+    max_size: int | None = None,
+    _debug=False,
+) -> Iterator[dict[str, int]]:
+    """
+    Parses the output of a CABEAN target control method line by line and
+    yields the control sets as they are read.
+
+    Of the attractors printed by CABEAN, only whether they all satisfy the
+    target is kept (for the trivial solution when there is a single one).
+    If `max_size` is given, the parsing stops at the first control set larger
+    than `max_size`, as CABEAN reports them by increasing size.
+    """
+    # positions of the target nodes in the states printed by CABEAN
+    # (one character per node, separated by spaces)
+    positions = {k: 2 * i for i, k in enumerate(cabean_obj.iface.ordered_nodes)}
+    target_spec = [(positions[k], str(v)) for k, v in target.items() if k in positions]
+
+    decomp = False
+    in_attractor = False
+    is_phenotype = True
+    one_attractor = None
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith("=") and "=== find attractor #" in line:
+            in_attractor = True
+            continue
+        if in_attractor:
+            if not line:
+                in_attractor = False
+            elif not line.startswith(":"):
+                spec = line.split()[0]
+                if any(spec[i] != v for i, v in target_spec):
+                    is_phenotype = False
+            continue
+        if not decomp:
+            decomp = "DECOMP" in line
+            continue
 
+        if line.startswith("There is only one attractor."):
+            # decided at the end of the output, once every attractor is read
+            one_attractor = line
         if line.startswith("Error:"):
             # Error: could not find any attractor based on the markers of attractors.
             if _debug:
                 main_logger.info(line)
         if line.lower().startswith("control set"):
-            p = dict()
-            for c in line.strip().split():
-                if "=" in c:
-                    node, value = c.split("=")
-                    p[node] = int(value)
-            ctrl_list.append(p)
-    return ctrl_list
+            p = _parse_controlset(line)
+            if max_size is not None and len(p) > max_size:
+                break
+            yield p
+
+    if one_attractor is not None:
+        # Trivial solution if the target already satisfies a phenotype
+        # Otherwise, the phenotype is not satisfied
+        if is_phenotype:
+            yield dict()
+        if _debug:
+            main_logger.info(one_attractor)
+            main_logger.info(cabean_obj.attractors)
+            main_logger.info(f"phenotype: {target}, {is_phenotype}")
+
+
+def ctrl_target_control_iface(
+    cabean_obj: CabeanInstance,
+    target: dict[str, int],
+    method: str,
+    cachedir: str = "",
+    key: str = "",
+    max_size: int | None = None,
+    _debug=False,
+    **kwargs,
+) -> Iterator[dict[str, int]]:
+    """
+    Runs a target control method of CABEAN and yields its control sets while
+    CABEAN is still running. CABEAN is killed if the parsing stops early.
+    """
+    cabean_bn_fname = cabean_ispl_file(cabean_obj, cachedir, key)
+    with cabean_target_file(target) as cabean_target_fname:
+        cmd = cabean_control_cmd(method, cabean_target_fname, cabean_bn_fname)
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=console_output_file() or subprocess.DEVNULL,
+            text=True,
+        )
+        try:
+            yield from iter_target_control(
+                cabean_obj, target, proc.stdout, max_size, _debug
+            )
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+
+
+@time_check
+def ctrl_target_control_concurrent(
+    cabean_obj: CabeanInstance,
+    target: dict[str, int],
+    methods=CABEAN_METHODS,
+    cachedir: str = "",
+    key: str = "",
+    _debug=False,
+) -> dict[str, list[dict[str, int]]]:
+    """
+    Runs several target control methods of CABEAN at once, as concurrent
+    subprocesses sharing the ISPL model and the target file. The output of
+    each method goes to a temporary file, so that no process waits on a full
+    pipe.
+    """
+    cabean_bn_fname = cabean_ispl_file(cabean_obj, cachedir, key)
+    with cabean_target_file(target) as cabean_target_fname, contextlib.ExitStack() as stack:
+        procs = dict()
+        for method in methods:
+            out = stack.enter_context(tempfile.TemporaryFile("w+"))
+            cmd = cabean_control_cmd(method, cabean_target_fname, cabean_bn_fname)
+            stderr = console_output_file() or subprocess.DEVNULL
+            procs[method] = (subprocess.Popen(cmd, stdout=out, stderr=stderr), out)
+        results = dict()
+        for method, (proc, out) in procs.items():
+            proc.wait()
+            out.seek(0)
+            results[method] = list(iter_target_control(cabean_obj, target, out, _debug=_debug))
+    return results
+
+
+def _method_result_file(
+    cabean_obj: CabeanInstancePrecomputed, method: str, target: dict[str, int], cachedir: str = ""
+) -> str:
+    """
+    File of the results of `method` computed concurrently with another method
+    of the same experiment. The files live in a temporary folder of the
+    instance, under the cache directory of the experiment if any, removed
+    with the instance (see `free_cabean_instance`).
+    """
+    if not getattr(cabean_obj, "results_dir", None):
+        cabean_obj.results_dir = tempfile.mkdtemp(prefix="cabean_results", dir=cachedir or None)
+    target_key = hashlib.sha256(json.dumps(target, sort_keys=True).encode()).hexdigest()
+    return f"{cabean_obj.results_dir}/{target_key[:16]}_{method}.json"
 
 
 # ---------------------------------
@@ -204,38 +387,73 @@ class CABEAN_TargetControlBase:
     """
 
     uses_cache = True
+    parallel = True
+    can_stop_early = True  # `run` accepts `early_stop`
     bn_type = "bnet_file"  # this runner expects a colomoto BooleanNetwork object
+    version = "2.0.1"  # version of the CABEAN binary
 
     method = (
         "node"  # default control method passed to cabean binary; override in subclasses
     )
 
     @classmethod
-    @time_check
     def run(
         cls,
         bn: BooleanNetwork,
-        max_size: int,  # kept for API parity; CABEAN methods ignore it
+        max_size: int,  # CABEAN methods ignore it, except for `early_stop`
         target: dict,
         exclude: list,  # not used by CABEAN CLI here; reserved for future
         expid: int,
         cachedir: str,
+        workers: int = 1,
+        early_stop: bool = False,
         _debug: bool = False,
         **kwargs,
     ):
         """
         Ensure CabeanInstance is cached per expid, then compute controls.
+
+        With `workers` > 1, the other target control methods are run
+        concurrently with this one, and their results are kept until the end
+        of the experiment for the runs of the corresponding tools (with
+        `workers` > 1 as well).
+
+        With `early_stop`, CABEAN is stopped at the first control set larger
+        than `max_size`; the full result then only lists the smaller ones.
+        The methods run concurrently (`workers` > 1) are not stopped early.
         """
+        key = file_digest(bn)
         if expid not in cache:
-            inst = make_cabean_iface(bn, cachedir)
-            if inst == CABEAN_OUT_MEMORY:
-                return list()
-            cache[expid] = inst
+            cache[expid] = make_cabean_iface(bn, cachedir, key)
+
+        if workers > 1:
+            inst = cache[expid]
+            fname = _method_result_file(inst, cls.method, target, cachedir)
+            if os.path.isfile(fname):
+                main_logger.info(f"Loaded {cls.method} controls computed concurrently")
+                with open(fname) as _f:
+                    return json.load(_f)
+            methods = [cls.method] + [
+                m
+                for m in CABEAN_METHODS
+                if m != cls.method and not os.path.isfile(_method_result_file(inst, m, target, cachedir))
+            ]
+            results = ctrl_target_control_concurrent(
+                inst, target, methods[:workers], cachedir, key, _debug
+            )
+            for method, ctrl_list in results.items():
+                if method != cls.method:
+                    with atomic_write(_method_result_file(inst, method, target, cachedir)) as _f:
+                        json.dump(ctrl_list, _f)
+            return results[cls.method]
 
         return ctrl_target_control_iface(
             cache[expid],
             target=target,
             method=cls.method,
+            cachedir=cachedir,
+            key=key,
+            max_size=max_size if early_stop else None,
             _debug=_debug,
             **kwargs,
         )
@@ -243,7 +461,7 @@ class CABEAN_TargetControlBase:
     @staticmethod
     def free_experiment(expid: int):
         if expid in cache:
-            del cache[expid]
+            free_cabean_instance(cache.pop(expid))
 
 
 # Example registered tools (adjust names/methods to your needs)
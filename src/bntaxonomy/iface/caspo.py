@@ -1,5 +1,5 @@
 from bntaxonomy.iface import register_tool
-from bntaxonomy.utils.control import refine_pert
+from bntaxonomy.utils.control import iter_perturbations
 from bntaxonomy.utils.log import time_check
 
 from colomoto.minibn import BooleanNetwork
@@ -8,6 +8,7 @@ import caspo_control
 @register_tool
 class CaspoVPTS:
     name = "Caspo"
+    package = "caspo-control"
     bn_type = "colomoto.BooleanNetwork"
 
     @time_check
@@ -16,4 +17,4 @@ class CaspoVPTS:
             target: dict[str, int], exclude: list[str]):
         model = caspo_control.CaspoControl(bn, {})
         s = model.reprogramming_to_attractor(target, maxsize=max_size)
-        return refine_pert(s)
+        return iter_perturbations(s)
@@ -6,6 +6,7 @@ from optboolnet.launch import control_fixpoint, control_sync_attr_no_separation
 @register_tool
 class OptBoolNetFixPoints:
     name = "optbn[FP]"
+    package = "optboolnet"
     bn_type = "colomoto.BooleanNetwork"
 
     @time_check
@@ -18,6 +19,7 @@ class OptBoolNetFixPoints:
 @register_tool
 class OptBoolNetSyncAttr:
     name = "optbn[SA]"
+    package = "optboolnet"
     bn_type = "colomoto.BooleanNetwork"
 
     @time_check
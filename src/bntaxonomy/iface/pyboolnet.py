@@ -3,14 +3,14 @@ All rights to the CABEAN tool and its outputs belong to the original authors.
 * Cifuentes Fontanals, L., Tonello, E., & Siebert, H. (2020). Control Strategy Identification via Trap Spaces in Boolean Networks. In A. Abate, T. Petrov, & V. Wolf (Eds.), Computational Methods in Systems Biology (pp. 159–175). Springer International Publishing. https://doi.org/10.1007/978-3-030-60327-4_9 (GitHub: https://github.com/Lauracf/trap-space-control/blob/master/control_strategies.py)
 * Fontanals Laura, C., Tonello, E., & Siebert, H. (2022). Computing trap space-based control strategies for Boolean networks using answer set programming. AIP Conference Proceedings, 2611(1), 110002. https://doi.org/10.1063/5.0122073
 """
-import json
 import logging
-import os
 
 from bntaxonomy.iface import register_tool
-from bntaxonomy.utils.log import time_check, main_logger
+from bntaxonomy.utils.control import LiteralEncoder, SubsetIndex
+from bntaxonomy.utils.log import time_check
+from bntaxonomy.utils.primes import primes_cache, to_pyboolnet
 
-from pyboolnet.file_exchange import bnet2primes
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations, product
 from typing import List, Optional
 
@@ -167,7 +167,7 @@ def run_control_query(primes: dict, target: List[dict], update: str) -> bool:
     return answer
 
 
-def control_direct_percolation(primes: dict, candidate: dict, target: List[dict]) -> bool:
+def control_direct_percolation(primes: dict, candidate: dict, target: List[dict], perc: Optional[dict] = None) -> bool:
     """
     Check whether the subspace *candidate* is a control strategy for *target* by direct percolation.
 
@@ -175,12 +175,14 @@ def control_direct_percolation(primes: dict, candidate: dict, target: List[dict]
         * *primes*: prime implicants.
         * *candidate*: subspace.
         * *target*: list of subspaces defining the target subset.
+        * *perc*: percolation of *candidate*, computed if not given.
 
     **returns**:
         * True if the *candidate* percolates into the *target*, False otherwise.
     """
 
-    perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
+    if perc is None:
+        perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
 
     if any(is_included_in_subspace(perc, subs) for subs in target):
         log.info(f"Intervention (only percolation): {candidate}")
@@ -189,7 +191,7 @@ def control_direct_percolation(primes: dict, candidate: dict, target: List[dict]
     return False
 
 
-def control_completeness(primes: dict, candidate: dict, target: dict, update: str) -> Optional[bool]:
+def control_completeness(primes: dict, candidate: dict, target: dict, update: str, perc: Optional[dict] = None) -> Optional[bool]:
     """
     Check whether the subspace *candidate* is a control strategy for *target* by the completeness approach,
     described in :ref:`CifuentesFontanals2022 <CifuentesFontanals2022>` Sec 3.2.
@@ -199,6 +201,7 @@ def control_completeness(primes: dict, candidate: dict, target: dict, update: st
         * *candidate*: subspace.
         * *target*: subspace defining the target subset.
         * *update*: type of update, either *"synchronous"*, *"asynchronous"* or *"mixed"*.
+        * *perc*: percolation of *candidate*, computed if not given.
 
     **returns**:
         * True if the *candidate* is a control strategy by completeness for *target*, False otherwise.
@@ -208,7 +211,8 @@ def control_completeness(primes: dict, candidate: dict, target: dict, update: st
         log.error("The target must be a subspace (dict).")
         return
 
-    perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
+    if perc is None:
+        perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
     new_primes = fix_components_and_reduce(primes, perc, keep_vars=list(target.keys()))
     minimal_trap_spaces = compute_trap_spaces(new_primes, "min")
 
@@ -222,7 +226,7 @@ def control_completeness(primes: dict, candidate: dict, target: dict, update: st
     return False
 
 
-def control_model_checking(primes: dict, candidate: dict, target: List[dict], update: str, max_output_trapspaces: int = 10000000) -> Optional[bool]:
+def control_model_checking(primes: dict, candidate: dict, target: List[dict], update: str, max_output_trapspaces: int = 10000000, perc: Optional[dict] = None) -> Optional[bool]:
     """
     Check whether the subspace *candidate* is a control strategy for *target* using the model checking approach
     described in :ref:`CifuentesFontanals2022 <CifuentesFontanals2022>` Sec 4.3.
@@ -232,6 +236,7 @@ def control_model_checking(primes: dict, candidate: dict, target: List[dict], up
         * *candidate*: subspace.
         * *target*: list of subspaces defining the target subset.
         * *update*: type of update, either *"synchronous"*, *"asynchronous"* or *"mixed"*.
+        * *perc*: percolation of *candidate*, computed if not given.
 
     **returns**:
         * True if the *candidate* is a control strategy by completeness for *target*, False otherwise.
@@ -241,7 +246,8 @@ def control_model_checking(primes: dict, candidate: dict, target: List[dict], up
         log.error("The target must be a list of subspaces.")
         return
 
-    perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
+    if perc is None:
+        perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
     new_primes = fix_components_and_reduce(primes, perc, keep_vars=list(set([item for subs in target for item in subs])))
     minimal_trap_spaces = compute_trap_spaces(new_primes, "min", max_output=max_output_trapspaces)
 
@@ -334,6 +340,138 @@ def is_control_strategy(primes: dict, candidate: dict, target: List[dict], updat
     return answer
 
 
+class PercolationEngine:
+    """
+    Percolation of candidate subspaces, memoized by frozen state.
+
+    The percolation of a candidate is extended from the one of the candidate without its last
+    variable, computed in the previous layer of the search, instead of percolating a full copy of
+    *primes*. Only the current and the previous layers are kept in memory.
+
+    A variable becomes constant as soon as one of its prime implicants is satisfied by the fixed
+    variables, so that *percolate(candidate)* equals
+    *find_constants(percolate(primes, add_constants=candidate, copy=True))*.
+    The returned dicts are shared with the memo table and must not be modified.
+    """
+
+    def __init__(self, primes: dict):
+        self.primes = {x: [[tuple(p.items()) for p in side] for side in primes[x]] for x in primes}
+        self.dependents = {x: set() for x in primes}
+        for x, sides in primes.items():
+            for side in sides:
+                for p in side:
+                    for y in p:
+                        self.dependents.setdefault(y, set()).add(x)
+        self.constants = {x: v for x, sides in self.primes.items() for v in (0, 1) if () in sides[v]}
+        self._memo = {}
+        self._prev = {}
+
+    def next_layer(self):
+        """Start a new layer of candidates, one variable larger than the previous one."""
+        self._prev = self._memo
+        self._memo = {}
+
+    def _propagate(self, fixed: dict, queue: List[str]) -> dict:
+        while queue:
+            y = queue.pop()
+            for x in self.dependents.get(y, ()):
+                if x in fixed:
+                    continue
+                for v in (0, 1):
+                    if any(all(fixed.get(z) == w for z, w in p) for p in self.primes[x][v]):
+                        fixed[x] = v
+                        queue.append(x)
+                        break
+        return fixed
+
+    def _percolate_from_scratch(self, candidate: dict) -> dict:
+        fixed = dict(candidate)
+        for x, v in self.constants.items():
+            fixed.setdefault(x, v)
+        return self._propagate(fixed, list(fixed))
+
+    def percolate(self, candidate: dict, last: Optional[str] = None) -> dict:
+        """
+        Percolation of *candidate*, extended from the one of *candidate* without *last* when known.
+        """
+
+        key = frozenset(candidate.items())
+        perc = self._memo.get(key)
+        if perc is not None:
+            return perc
+
+        parent = None
+        if last is not None:
+            parent_key = key - {(last, candidate[last])}
+            parent = self._prev.get(parent_key, self._memo.get(parent_key))
+
+        if parent is None or (last in parent and parent[last] != candidate[last]):
+            perc = self._percolate_from_scratch(candidate)
+        elif last in parent:
+            perc = parent
+        else:
+            perc = dict(parent)
+            perc[last] = candidate[last]
+            perc = self._propagate(perc, [last])
+
+        self._memo[key] = perc
+        return perc
+
+
+class StrategyIndex:
+    """
+    Strategies found by a search, indexed for the minimality filter.
+
+    As in the original implementation, the percolations of the strategies are stored in the same
+    list as the strategies. Strategies are indexed as literal bitmasks, so that checking whether a
+    candidate includes one of them does not scan the whole list.
+    """
+
+    def __init__(self, strategies: List[dict]):
+        self.strategies = strategies
+        self.encoder = LiteralEncoder()
+        self.index = SubsetIndex()
+        self.keys = set()
+        for x in strategies:
+            self._add_to_index(x)
+
+    def _add_to_index(self, subspace: dict):
+        self.keys.add(frozenset(subspace.items()))
+        self.index.add(self.encoder.encode(subspace))
+
+    def __contains__(self, key: frozenset) -> bool:
+        return key in self.keys
+
+    def append(self, subspace: dict):
+        self.strategies.append(subspace)
+        self._add_to_index(subspace)
+
+    def includes_strategy(self, candidate: dict) -> bool:
+        """
+        Whether *candidate* is included in the subspace of a stored strategy.
+        """
+
+        return self.index.has_subset_of(self.encoder.encode(candidate))
+
+
+def find_target_ancestors(primes: dict, target: List[dict]) -> set:
+    """
+    Find the variables of *primes* that have a path to a variable of the *target* in the interaction graph.
+    The variables of the *target* are included.
+    """
+
+    regulators = {x: {y for side in primes[x] for p in side for y in p} for x in primes}
+    ancestors = {x for subs in target for x in subs if x in primes}
+    queue = list(ancestors)
+    while queue:
+        for y in regulators[queue.pop()]:
+            if y not in ancestors:
+                ancestors.add(y)
+                queue.append(y)
+
+    return ancestors
+
+
 def compute_control_strategies_with_completeness(primes: dict, target: dict, update: str = "asynchronous", limit: int = 3, avoid_nodes: List[str] = None, starting_length: int = 0, known_strategies: List[dict] = None) -> Optional[List[dict]]:
     """
     Identify control strategies for the *target* subspace using the completeness approach
@@ -364,8 +502,9 @@ def compute_control_strategies_with_completeness(primes: dict, target: dict, upd
 
     candidate_variables = [x for x in primes.keys() if x not in avoid_nodes]
     list_strategies = known_strategies
-    perc_true = known_strategies
-    perc_false = []
+    found = StrategyIndex(list_strategies)
+    perc_false = set()
+    engine = PercolationEngine(primes)
 
     common_vars_in_cs = find_common_variables_in_control_strategies(primes, [target])
     candidate_variables = [x for x in primes.keys() if x not in common_vars_in_cs.keys() and x not in avoid_nodes]
@@ -376,6 +515,7 @@ def compute_control_strategies_with_completeness(primes: dict, target: dict, upd
     for i in range(max(0, starting_length - len(common_vars_in_cs)), limit + 1 - len(common_vars_in_cs)):
 
         log.info(f"Checking control strategies of size {i + len(common_vars_in_cs)}")
+        engine.next_layer()
 
         for vs in combinations(candidate_variables, i):
 
@@ -384,34 +524,48 @@ def compute_control_strategies_with_completeness(primes: dict, target: dict, upd
                 candidate = dict(zip(vs, ss))
                 candidate.update(common_vars_in_cs)
 
-                if not any(is_included_in_subspace(candidate, x) for x in list_strategies):
-                    perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
+                if not found.includes_strategy(candidate):
+                    perc = engine.percolate(candidate, last=vs[-1] if vs else None)
+                    perc_key = frozenset(perc.items())
 
-                    if perc in perc_true:
+                    if perc_key in found:
                         log.info(f"Intervention: {candidate}")
-                        list_strategies.append(candidate)
+                        found.append(candidate)
 
-                    elif perc not in perc_false:
+                    elif perc_key not in perc_false:
 
-                        if control_direct_percolation(primes, candidate, [target]):
-                            perc_true.append(perc)
-                            list_strategies.append(candidate)
-
-                        elif control_completeness(primes, candidate, target, update):
-                            perc_true.append(perc)
-                            list_strategies.append(candidate)
+                        if control_direct_percolation(primes, candidate, [target], perc=perc) or control_completeness(primes, candidate, target, update, perc=perc):
+                            found.append(dict(perc))
+                            found.append(candidate)
 
                         else:
-                            perc_false.append(perc)
+                            perc_false.add(perc_key)
 
     return list_strategies
 
 
-def compute_control_strategies_with_model_checking(primes: dict, target: List[dict], update: str = "asynchronous", limit: int = 3, avoid_nodes: List[str] = None, max_output_trapspaces: int = 1000000, starting_length: int = 0, known_strategies: List[dict] = None) -> Optional[List[dict]]:
+_worker_primes = None
+
+
+def _init_candidate_worker(primes: dict):
+    global _worker_primes
+    _worker_primes = primes
+
+
+def _check_candidate_model_checking(job: tuple) -> bool:
+    candidate, perc, target, update = job
+    return bool(control_direct_percolation(_worker_primes, candidate, target, perc=perc) or control_model_checking(_worker_primes, candidate, target, update, perc=perc))
+
+
+def compute_control_strategies_with_model_checking(primes: dict, target: List[dict], update: str = "asynchronous", limit: int = 3, avoid_nodes: List[str] = None, max_output_trapspaces: int = 1000000, starting_length: int = 0, known_strategies: List[dict] = None, workers: int = 1) -> Optional[List[dict]]:
     """
     Identify all minimal control strategies for the *target* subset using the model checking approach
     described in :ref:`CifuentesFontanals2022 <CifuentesFontanals2022>` Sec 4.3.
 
+    Candidates of the same size are independent of each other, so with *workers* > 1 the candidates
+    of each size whose percolation is not decided yet are checked on a process pool. The minimality
+    filter is then applied in the sequential order, so that the result does not depend on *workers*.
+
     **arguments**:
         *primes*: prime implicants
         *target*: list of subspaces defining the target subset
@@ -420,6 +574,7 @@ def compute_control_strategies_with_model_checking(primes: dict, target: List[di
         *starting_length*: minimum possible size of the control strategies. Default value: 0.
         *known_strategies*: list of already identified control strategies. Default value: empty list.
         *avoid_nodes*: list of nodes that cannot be part of the control strategies. Default value: empty list.
+        *workers*: number of worker processes checking candidates. Default value: 1.
 
     **returns**:
         * *list_strategies*: list of control strategies (dict) of *subspace* obtained using completeness.
@@ -437,60 +592,88 @@ def compute_control_strategies_with_model_checking(primes: dict, target: List[di
     known_strategies = known_strategies or []
 
     list_strategies = known_strategies
-    perc_true = known_strategies
-    perc_false = []
+    found = StrategyIndex(list_strategies)
+    perc_false = set()
+    engine = PercolationEngine(primes)
 
     common_vars_in_cs = find_common_variables_in_control_strategies(primes, target)
-    candidate_variables = [x for x in primes.keys() if x not in common_vars_in_cs.keys() and x not in avoid_nodes]
+    # Fixing a variable without path to the target leaves the dynamics of the target
+    # unchanged, so such a variable never belongs to a minimal strategy.
+    target_ancestors = find_target_ancestors(primes, target)
+    candidate_variables = [x for x in primes.keys() if x not in common_vars_in_cs.keys() and x not in avoid_nodes and x in target_ancestors]
     log.info(f"Number of common variables in the CS: {len(common_vars_in_cs)}")
     log.info(f"Number of candiadate variables: {len(candidate_variables)}")
 
-
-    for i in range(max(0, starting_length - len(common_vars_in_cs)), limit + 1 - len(common_vars_in_cs)):
-
-        log.info(f"Checking control strategies of size {i + len(common_vars_in_cs)}")
-
-        for vs in combinations(candidate_variables, i):
-            subsets = product(*[(0, 1)]*i)
-
-            for ss in subsets:
-                candidate = dict(zip(vs, ss))
-                candidate.update(common_vars_in_cs)
-
-                if not any(is_included_in_subspace(candidate, x) for x in list_strategies):
-                    perc = find_constants(primes=percolate(primes=primes, add_constants=candidate, copy=True))
-
-                    if perc in perc_true:
-                        log.info(f"Intervention: {candidate}")
-                        list_strategies.append(candidate)
-
-                    elif perc not in perc_false:
-
-                        if control_direct_percolation(primes, candidate, target):
-                            perc_true.append(perc)
-                            list_strategies.append(candidate)
-
-                        elif control_model_checking(primes, candidate, target, update):
-                            perc_true.append(perc)
-                            list_strategies.append(candidate)
-
-                        else:
-                            perc_false.append(perc)
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_candidate_worker, initargs=(primes,))
+
+    try:
+        for i in range(max(0, starting_length - len(common_vars_in_cs)), limit + 1 - len(common_vars_in_cs)):
+
+            log.info(f"Checking control strategies of size {i + len(common_vars_in_cs)}")
+            engine.next_layer()
+
+            # A candidate cannot include another candidate of the same size, so the
+            # strategies found in this layer never filter out the rest of the layer.
+            # The layer is only materialized to dispatch it on the worker pool.
+            def iter_layer(i=i):
+                for vs in combinations(candidate_variables, i):
+                    subsets = product(*[(0, 1)]*i)
+
+                    for ss in subsets:
+                        candidate = dict(zip(vs, ss))
+                        candidate.update(common_vars_in_cs)
+
+                        if not found.includes_strategy(candidate):
+                            yield candidate, engine.percolate(candidate, last=vs[-1] if vs else None)
+
+            layer = iter_layer()
+            answers = {}
+            if executor is not None:
+                layer = list(layer)
+                pending = {}
+                for candidate, perc in layer:
+                    perc_key = frozenset(perc.items())
+                    if perc_key not in found and perc_key not in perc_false:
+                        pending.setdefault(perc_key, (candidate, perc, target, update))
+                if pending:
+                    chunksize = max(1, len(pending) // (4 * workers))
+                    answers = dict(zip(pending, executor.map(_check_candidate_model_checking, pending.values(), chunksize=chunksize)))
+
+            for candidate, perc in layer:
+                perc_key = frozenset(perc.items())
+
+                if perc_key in found:
+                    log.info(f"Intervention: {candidate}")
+                    found.append(candidate)
+
+                elif perc_key not in perc_false:
+
+                    answer = answers.get(perc_key)
+                    if answer is None:
+                        answer = control_direct_percolation(primes, candidate, target, perc=perc) or control_model_checking(primes, candidate, target, update, perc=perc)
+
+                    if answer:
+                        found.append(dict(perc))
+                        found.append(candidate)
+
+                    else:
+                        perc_false.add(perc_key)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
     return list_strategies
 
 
 
-from clingo import Control
+from clingo import Control, Function, Number
 from pyboolnet.trap_spaces import compute_trapspaces_that_intersect_subspace
 
-def run_node_edge_control_asp(program_instance: str):
-    
-    ctl = Control(arguments=[f"--models=0", "--opt-mode=optN", "--enum-mode=domRec", "--heuristic=Domain", "--dom-mod=5,16",])
-    
-    ctl.add(name="base", parameters={}, program=program_instance)
-    
-    ctl.add(name="base", parameters={}, program="""
+ASP_SOLVER_ARGUMENTS = ["--models=0", "--opt-mode=optN", "--enum-mode=domRec", "--heuristic=Domain", "--dom-mod=5,16"]
+
+NODE_EDGE_CONTROL_ASP = """
         goal(T,S) :- goal(Z,T,S), Z < 0.
         satisfy(V,W,S) :- formula(W,D); dnf(D,C); clause(C,V,S).
         closure(V,T)   :- goal(V,T).
@@ -528,10 +711,17 @@ def run_node_edge_control_asp(program_instance: str):
         :- maxedges<0; 1 { edge(Vi,Vj,S) }.
         #show node/2.
         #show edge/3.
-        """)
-    
+        """
+
+
+def solve_node_edge_control(ctl: Control) -> List[list]:
+    """
+    Grounds and solves the node/edge control encoding added to *ctl* on top of its problem instance.
+    """
+
+    ctl.add(name="base", parameters={}, program=NODE_EDGE_CONTROL_ASP)
     ctl.ground([("base", [])])
-    
+
     models = []
     with ctl.solve(yield_=True) as handle:
         for model in handle:
@@ -540,6 +730,138 @@ def run_node_edge_control_asp(program_instance: str):
     return models
 
 
+def run_node_edge_control_asp(program_instance: str):
+
+    ctl = Control(arguments=ASP_SOLVER_ARGUMENTS)
+    ctl.add(name="base", parameters={}, program=program_instance)
+
+    return solve_node_edge_control(ctl)
+
+
+def asp_size_constants(intervention_type: str, max_size: int) -> dict:
+    """
+    Values of the constants *maxsize*, *maxnodes* and *maxedges* of the node/edge control encoding.
+    """
+
+    max_nodes = max_size
+    max_edges = max_size
+    if intervention_type == "node":
+        max_edges = -1
+    if intervention_type == "edge":
+        max_nodes = -1
+    return {"maxsize": max_size, "maxnodes": max_nodes, "maxedges": max_edges}
+
+
+def add_asp_program_facts(ctl: Control, primes: dict, target_trap_spaces: List[dict] = [], target_subspaces: List[dict] = [], avoid_nodes: List[str] = [], avoid_edges: List[str] = []):
+    """
+    Adds the facts of the control strategy problem to *ctl* through its backend.
+    Same facts as the text of *create_asp_program_instance*, without building nor parsing it.
+    """
+
+    names = {x: Function(x.lower()) for x in primes}
+
+    def name(x: str):
+        return names[x] if x in names else Function(x.lower())
+
+    def value(v: int):
+        return Number(-1 if str(v) == "0" else int(v))
+
+    with ctl.backend() as backend:
+
+        def fact(predicate: str, *arguments):
+            backend.add_rule([backend.add_atom(Function(predicate, list(arguments)))])
+
+        for x in avoid_edges:
+            fact("avoid_edge", name(x[0]), name(x[1]))
+
+        id_clause = 0
+        for id_form, x in enumerate(primes.keys()):
+            if x in avoid_nodes:
+                fact("avoid_node", names[x])
+            fact("formula", names[x], Number(id_form))
+            for p in primes[x][1]:
+                for y in p.keys():
+                    fact("clause", Number(id_clause), name(y), value(p[y]))
+                fact("dnf", Number(id_form), Number(id_clause))
+                id_clause += 1
+
+        for id_subspace, s in enumerate(target_subspaces, start=1):
+            fact("subspace", Number(-id_subspace))
+            for x in s.keys():
+                fact("goal", Number(-id_subspace), name(x), value(s[x]))
+
+        for id_subspace, s in enumerate(target_trap_spaces):
+            fact("subspace", Number(id_subspace))
+            for x in s.keys():
+                fact("goal", Number(id_subspace), name(x), value(s[x]))
+
+
+def run_node_edge_control(primes: dict, intervention_type: str, target_trap_spaces: List[dict] = [], target_subspaces: List[dict] = [], max_size: int = 3, avoid_nodes: List[str] = [], avoid_edges: List[str] = []) -> List[list]:
+    """
+    Solves the control strategy problem in ASP, with the problem instance given to clingo as facts.
+    Nothing is written to the working directory.
+    """
+
+    constants = asp_size_constants(intervention_type, max_size)
+    arguments = list(ASP_SOLVER_ARGUMENTS)
+    for k, v in constants.items():
+        arguments.extend(["-c", f"{k}={v}"])
+    ctl = Control(arguments=arguments)
+    add_asp_program_facts(ctl, primes, target_trap_spaces=target_trap_spaces, target_subspaces=target_subspaces, avoid_nodes=avoid_nodes, avoid_edges=avoid_edges)
+
+    return solve_node_edge_control(ctl)
+
+
+NODE_EDGE_CONTROL_SIZE_ASP = """
+        #external active_limit(k).
+        :- active_limit(k); k + 1 { node(V,R); edge(Vi,Vj,S) }.
+        """
+
+
+def iter_node_edge_control(primes: dict, intervention_type: str, target_trap_spaces: List[dict] = [], target_subspaces: List[dict] = [], max_size: int = 3, avoid_nodes: List[str] = [], avoid_edges: List[str] = []):
+    """
+    Solves the control strategy problem in ASP for the size limits 1 to *max_size* in turn, with a
+    single clingo control: the network encoding is grounded once, and each size limit is a program
+    part enabled through an external atom.
+
+    Yields *(size, models)* as soon as each size is solved, where *models* are the solutions that were
+    not found for smaller sizes. Their union is the result of *run_node_edge_control*.
+    """
+
+    if max_size <= 0:
+        yield max_size, run_node_edge_control(primes, intervention_type, target_trap_spaces=target_trap_spaces, target_subspaces=target_subspaces, max_size=max_size, avoid_nodes=avoid_nodes, avoid_edges=avoid_edges)
+        return
+
+    constants = asp_size_constants(intervention_type, max_size)
+    constants["maxsize"] = 0  # the size is limited by the active part instead
+    arguments = list(ASP_SOLVER_ARGUMENTS)
+    for k, v in constants.items():
+        arguments.extend(["-c", f"{k}={v}"])
+    ctl = Control(arguments=arguments)
+    add_asp_program_facts(ctl, primes, target_trap_spaces=target_trap_spaces, target_subspaces=target_subspaces, avoid_nodes=avoid_nodes, avoid_edges=avoid_edges)
+    ctl.add(name="base", parameters={}, program=NODE_EDGE_CONTROL_ASP)
+    ctl.add(name="size_limit", parameters=["k"], program=NODE_EDGE_CONTROL_SIZE_ASP)
+    ctl.ground([("base", [])])
+
+    for size in range(1, max_size + 1):
+        ctl.ground([("size_limit", [Number(size)])])
+        if size > 1:
+            ctl.release_external(Function("active_limit", [Number(size - 1)]))
+        ctl.assign_external(Function("active_limit", [Number(size)]), True)
+
+        models = []
+        with ctl.solve(yield_=True) as handle:
+            for model in handle:
+                models.append(model.symbols(shown=True))
+
+        # Solutions and their supersets are not minimal for larger sizes
+        with ctl.backend() as backend:
+            for model in models:
+                backend.add_rule([], [ctl.symbolic_atoms[x].literal for x in model])
+
+        yield size, models
+
+
 def read_asp_output(primes: dict, models: List[list]):
 
     lower_to_prime = {n.lower(): n for n in primes}
@@ -558,7 +880,11 @@ def read_asp_output(primes: dict, models: List[list]):
     return cs_total
 
 
-def run_control_problem(primes, target, intervention_type, control_type, avoid_nodes: dict = {}, avoid_edges: dict = {}, limit: int = 3, output_file: str = "", use_attractors: bool = True, complex_attractors: List[List[dict]] = []):
+def iter_control_problem(primes, target, intervention_type, control_type, avoid_nodes: dict = {}, avoid_edges: dict = {}, limit: int = 3, use_attractors: bool = True, complex_attractors: List[List[dict]] = [], incremental: bool = True):
+    """
+    Yields the control strategies of *run_control_problem* as they are found: with *incremental*,
+    the strategies of each size are yielded as soon as this size is solved.
+    """
 
     # Setting targets and computing selected trap spaces
 
@@ -582,9 +908,18 @@ def run_control_problem(primes, target, intervention_type, control_type, avoid_n
 
     # Computing CS in ASP
 
-    program_instance = create_asp_program_instance(primes=primes, intervention_type=intervention_type, target_trap_spaces=target_trap_spaces, target_subspaces=target_percolation, max_size=limit, avoid_nodes=avoid_nodes, avoid_edges=avoid_edges, filename="program_instance")
-    models = run_node_edge_control_asp(program_instance)
-    cs_asp = read_asp_output(primes, models)
+    if incremental:
+        for size, models in iter_node_edge_control(primes=primes, intervention_type=intervention_type, target_trap_spaces=target_trap_spaces, target_subspaces=target_percolation, max_size=limit, avoid_nodes=avoid_nodes, avoid_edges=avoid_edges):
+            log.info(f"Control strategies up to size {size}: {len(models)} new")
+            yield from read_asp_output(primes, models)
+    else:
+        models = run_node_edge_control(primes=primes, intervention_type=intervention_type, target_trap_spaces=target_trap_spaces, target_subspaces=target_percolation, max_size=limit, avoid_nodes=avoid_nodes, avoid_edges=avoid_edges)
+        yield from read_asp_output(primes, models)
+
+
+def run_control_problem(primes, target, intervention_type, control_type, avoid_nodes: dict = {}, avoid_edges: dict = {}, limit: int = 3, output_file: str = "", use_attractors: bool = True, complex_attractors: List[List[dict]] = [], incremental: bool = True):
+
+    cs_asp = list(iter_control_problem(primes, target, intervention_type, control_type, avoid_nodes=avoid_nodes, avoid_edges=avoid_edges, limit=limit, use_attractors=use_attractors, complex_attractors=complex_attractors, incremental=incremental))
 
     # Saving output
 
@@ -653,13 +988,7 @@ def create_asp_program_instance(primes: dict, intervention_type: str, target_tra
             value = "-1" if str(s[x]) == "0" else str(s[x])
             goals = goals + "goal(" + str(id_subspace) + ", " + x + ", " + value + "). "
 
-    max_nodes = max_size
-    max_edges = max_size
-    if intervention_type == "node":
-        max_edges = -1
-    if intervention_type == "edge":
-        max_nodes = -1
-    constants = "#const maxsize=" + str(max_size) + "." + "\n\n" + "#const maxnodes=" + str(max_nodes) + "." + "\n\n" + "#const maxedges=" + str(max_edges) + "."
+    constants = "\n\n".join(f"#const {k}={v}." for k, v in asp_size_constants(intervention_type, max_size).items())
 
     final_text = nodes_to_avoid + "\n\n" + edges_to_avoid + "\n\n" + formulas + "\n\n" + dnfs + "\n\n" + clauses + "\n\n" + subspaces + "\n\n" + goals + "\n\n" + constants
     if filename != "":
@@ -759,50 +1088,29 @@ def results_info(list_cs: List[dict]):
 
 
 
-PRIME_JSON_FILE = "pyboolnet_primes.json"
-cache = {}
-
-def make_primes(bnfile, cachedir):
-    cache_file = f"{cachedir}/{PRIME_JSON_FILE}"
-    if cachedir and os.path.isfile(cache_file):
-        try:
-            with open(cache_file) as _f:
-                primes = json.load(_f)
-            main_logger.info("Loaded precomputed pyboolnet primes successfully")
-            return primes
-        except:
-            main_logger.info("Loading precomputed pyboolnet primes fails")
-
-    primes = time_check(bnet2primes)(bnfile)
-
-    if cachedir:
-        with open(cache_file, "w") as _f:
-            json.dump(primes, _f)
-
-    return primes
-
-
 class PyBoolNet_ModelChecking:
     uses_cache = True
+    uses_primes = True
+    parallel = True
     bn_type = "bnet_file"
+    package = "pyboolnet"
 
     @classmethod
     @time_check
     def run(self, bn: str, max_size:int, target:dict, exclude:list,
-            expid:int, cachedir:str):
-        if expid not in cache:
-            cache[expid] = make_primes(bn, cachedir)
+            expid:int, cachedir:str, workers:int=1):
+        primes = to_pyboolnet(primes_cache.get(bn, cachedir, expid))
 
         return compute_control_strategies_with_model_checking(
-                    primes=cache[expid],
+                    primes=primes,
                     target=[target],
                     update=self.update,
-                    limit=max_size,)
+                    limit=max_size,
+                    workers=workers,)
 
     @staticmethod
     def free_experiment(expid):
-        if expid in cache:
-            del cache[expid]
+        primes_cache.release(expid)
 
 
 @register_tool
@@ -818,17 +1126,17 @@ class PyBoolNet_ModelChecking_ASA(PyBoolNet_ModelChecking):
 
 class PyBoolNet_Heuristic:
     uses_cache = True
+    uses_primes = True
     bn_type = "bnet_file"
+    package = "pyboolnet"
 
     @classmethod
-    @time_check
     def run(self, bn: str, max_size:int, target:dict, exclude:list,
             expid:int, cachedir:str):
-        if expid not in cache:
-            cache[expid] = make_primes(bn, cachedir)
+        primes = to_pyboolnet(primes_cache.get(bn, cachedir, expid))
 
-        return run_control_problem(
-                    primes=cache[expid],
+        return iter_control_problem(
+                    primes=primes,
                     limit=max_size,
                     target=target,
                     control_type=self.control_type,
@@ -836,8 +1144,7 @@ class PyBoolNet_Heuristic:
 
     @staticmethod
     def free_experiment(expid):
-        if expid in cache:
-            del cache[expid]
+        primes_cache.release(expid)
 
 
 @register_tool
@@ -1,78 +1,86 @@
 # stablemotif.py  — cached, registry-friendly runners
 
-import json
+import importlib.metadata
 import os
+import pickle
+
 import pystablemotifs as sm
 
 from bntaxonomy.iface import register_tool
-from bntaxonomy.utils.log import time_check
-
-PRIME_JSON_FILE = "pystablemotif_primes.json"
+from bntaxonomy.utils.cache import atomic_write, file_digest
+from bntaxonomy.utils.log import main_logger, time_check
+from bntaxonomy.utils.primes import primes_cache, to_stablemotifs
+from bntaxonomy.utils.trace import PHASE_ATTRACTORS
 
 
 # -----------------------
 # In-memory experiment cache
 # -----------------------
+# Primes are shared with the other interfaces through `primes_cache`.
 # Per expid we keep:
-#   - "primes": SM primes dict (from file or JSON cache)
-#   - "attrs":  AttractorRepertoire (constructed once per expid)
+#   - "key":    digest of the model
+#   - "attrs":  AttractorRepertoire (constructed once per model, shared by the
+#               experiments on the same model and persisted in `cachedir`)
 _cache: dict[int, dict[str, object]] = {}
 
+REPERTOIRE_FILE = "sm_repertoire.pkl"
+
 
 # -----------------------
-# Disk cache helpers
+# Preprocessing (cached)
 # -----------------------
-def _sm_cache_file(cachedir: str) -> str:
-    return f"{cachedir}/{PRIME_JSON_FILE}" if cachedir else ""
+@time_check(phase=PHASE_ATTRACTORS)
+def make_sm_attrs_iface(sm_primes: dict):
+    """
+    Construct an AttractorRepertoire from primes (see `load_sm_attrs` for the cache).
+    """
+    return sm.AttractorRepertoire.from_primes(sm_primes)
 
 
-@time_check
-def _try_load_primes(cachedir: str) -> dict | None:
-    fname = _sm_cache_file(cachedir)
-    if not fname or not os.path.isfile(fname):
-        return None
+def _repertoire_header(key: str) -> dict:
+    # pickles are only reused for the same model and pystablemotifs version
     try:
-        with open(fname) as f:
-            return json.load(f)
-    except Exception:
-        return None
+        version = importlib.metadata.version("pystablemotifs")
+    except importlib.metadata.PackageNotFoundError:
+        version = ""
+    return {"model": key, "pystablemotifs": version}
 
 
-@time_check
-def _save_primes(primes: dict, cachedir: str) -> None:
-    fname = _sm_cache_file(cachedir)
-    if not fname:
-        return
-    try:
-        with open(fname, "w") as f:
-            json.dump(primes, f)
-    except Exception:
-        # best-effort; ignore write errors
-        pass
-
-
-# -----------------------
-# Preprocessing (cached)
-# -----------------------
-@time_check
-def make_sm_primes_iface(bnet_fname: str, cachedir: str = "") -> dict:
+@time_check(phase=PHASE_ATTRACTORS)
+def load_sm_attrs(cachedir: str, key: str):
     """
-    Load primes from on-disk JSON cache if present; otherwise import from file and cache.
+    Restore the AttractorRepertoire persisted in `cachedir`, if it was built
+    from the model of digest `key`. Returns None otherwise.
     """
-    primes = _try_load_primes(cachedir)
-    if primes is None:
-        # Import from .bnet (or equivalent) and write cache
-        primes = sm.format.import_primes(bnet_fname)
-        _save_primes(primes, cachedir)
-    return primes
+    fname = os.path.join(cachedir, REPERTOIRE_FILE) if cachedir else ""
+    if not fname or not os.path.isfile(fname):
+        return None
+    try:
+        with open(fname, "rb") as _f:
+            # the header is read first, so that a stale repertoire is not unpickled
+            if pickle.load(_f) != _repertoire_header(key):
+                main_logger.info("Ignoring stale StableMotifs repertoire cache")
+                return None
+            attrs = pickle.load(_f)
+    except Exception as e:
+        main_logger.info(f"Loading StableMotifs repertoire cache failed: {e}")
+        return None
+    main_logger.info("Loaded precomputed StableMotifs repertoire successfully")
+    return attrs
 
 
-@time_check
-def make_sm_attrs_iface(sm_primes: dict):
+def save_sm_attrs(attrs, cachedir: str, key: str):
     """
-    Construct an AttractorRepertoire from primes (in-memory only).
+    Persist an AttractorRepertoire to `cachedir` (best-effort).
     """
-    return sm.AttractorRepertoire.from_primes(sm_primes)
+    if not cachedir:
+        return
+    try:
+        with atomic_write(os.path.join(cachedir, REPERTOIRE_FILE), "wb") as _f:
+            pickle.dump(_repertoire_header(key), _f)
+            pickle.dump(attrs, _f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        main_logger.info(f"Writing StableMotifs repertoire cache failed: {e}")
 
 
 # -----------------------
@@ -88,25 +96,38 @@ class _SM_Base:
     """
 
     uses_cache = True
+    uses_primes = True
     bn_type = "bnet_file"
+    package = "pystablemotifs"
 
     @classmethod
     def _ensure_primes(cls, expid: int, bnet_fname: str, cachedir: str) -> dict:
-        bucket = _cache.setdefault(expid, {})
-        if "primes" not in bucket:
-            bucket["primes"] = make_sm_primes_iface(bnet_fname, cachedir)
-        return bucket["primes"]
+        return to_stablemotifs(primes_cache.get(bnet_fname, cachedir, expid))
 
     @classmethod
-    def _ensure_attrs(cls, expid: int, primes: dict):
+    def _ensure_attrs(cls, expid: int, bnet_fname: str, cachedir: str):
         bucket = _cache.setdefault(expid, {})
         if "attrs" not in bucket:
-            bucket["attrs"] = make_sm_attrs_iface(primes)
+            key = file_digest(bnet_fname)
+            attrs = next(
+                (b["attrs"] for b in _cache.values() if b.get("key") == key and "attrs" in b),
+                None,
+            )
+            if attrs is None:
+                attrs = load_sm_attrs(cachedir, key)
+            if attrs is None:
+                # primes are only needed to build the repertoire
+                primes = cls._ensure_primes(expid, bnet_fname, cachedir)
+                attrs = make_sm_attrs_iface(primes)
+                save_sm_attrs(attrs, cachedir, key)
+            bucket["key"] = key
+            bucket["attrs"] = attrs
         return bucket["attrs"]
 
     @staticmethod
     def free_experiment(expid: int):
         _cache.pop(expid, None)
+        primes_cache.release(expid)
 
 
 @register_tool
@@ -158,8 +179,7 @@ class _SM_TrapSpaceBase(_SM_Base):
         cachedir: str,
         **kwargs,
     ):
-        primes = cls._ensure_primes(expid, bnet_fname, cachedir)
-        attrs = cls._ensure_attrs(expid, primes)
+        attrs = cls._ensure_attrs(expid, bnet_fname, cachedir)
         results = attrs.reprogram_to_trap_spaces(
             target,
             target_method="merge",
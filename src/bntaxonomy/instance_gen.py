@@ -2,9 +2,9 @@ import json
 import os
 import mpbn
 from colomoto.minibn import BooleanNetwork
-from itertools import product
 import networkx as nx
-from bntaxonomy.dep.converters import bn_of_asynchronous_transition_graph
+import numpy as np
+from bntaxonomy.dep.converters import bn_of_asynchronous_transition_array
 
 l1 = 0.8
 l2 = 2.0
@@ -31,25 +31,59 @@ drawing_options = {
 
 
 class InstanceGen:
+    """Instance specified by its asynchronous state transition graph (STG).
+
+    States are strings of the values of `x1`..`xn`. The STG is stored as a
+    successor bitmap indexed by the integer codes of the states: bit `i` of
+    `succ[s]` is set if the state of code `s` (whose bit `i` is the value of
+    `x{i+1}`) has a transition changing `x{i+1}`.
+    """
+
     def __init__(self, inst_name, size: int):
+        if size > 32:
+            raise ValueError("InstanceGen supports at most 32 components")
         self.inst_name = inst_name
         self.size = size
-        self.states = list("".join(values) for values in product("01", repeat=size))
-        self.G = nx.DiGraph()
-        self.G.add_nodes_from(self.states)
+        self.names = [f"x{i}" for i in range(1, 1 + size)]
+        self.succ = np.zeros(2**size, dtype=np.uint32)
+
+    def state_code(self, state: str) -> int:
+        return int(state[::-1], 2)
+
+    def state_of_code(self, code: int) -> str:
+        return "".join(str((code >> i) & 1) for i in range(self.size))
+
+    @property
+    def states(self):
+        return [self.state_of_code(code) for code in range(2**self.size)]
 
     def add_edge(self, source, target):
-        if sum(1 for a, b in zip(source, target) if a != b) != 1:
+        diff = self.state_code(source) ^ self.state_code(target)
+        if diff == 0 or diff & (diff - 1):
             raise ValueError(f"Invalid edge: {source} -> {target}")
-        self.G.add_edge(source, target)
+        self.succ[self.state_code(source)] |= diff
+
+    def add_transitions(self, sources: np.ndarray, components: np.ndarray):
+        """Adds the transitions changing `components[k]` (indices from 0) in
+        the states of codes `sources[k]`."""
+        sources = np.asarray(sources)
+        components = np.asarray(components, dtype=self.succ.dtype)
+        np.bitwise_or.at(self.succ, sources, self.succ.dtype.type(1) << components)
+
+    @property
+    def G(self) -> nx.DiGraph:
+        G = nx.DiGraph()
+        G.add_nodes_from(self.states)
+        sources, components = np.nonzero((self.succ[:, None] >> np.arange(self.size)) & 1)
+        for s, i in zip(sources.tolist(), components.tolist()):
+            G.add_edge(self.state_of_code(s), self.state_of_code(s ^ (1 << i)))
+        return G
 
     def show_stg(self):
         nx.draw(self.G, pos=topology[self.size], with_labels=True, **drawing_options)
 
     def to_bnet(self):
-        return bn_of_asynchronous_transition_graph(
-            self.G, [f"x{i}" for i in range(1, 1 + self.size)]
-        )
+        return bn_of_asynchronous_transition_array(self.succ, self.names)
 
     def save(self, fpath: str, inputs=dict(), target=dict()):
         os.makedirs(fpath, exist_ok=True)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+if __name__ == "__main__":
+    import sys
+    from os.path import dirname, abspath
+
+    libdir = dirname(dirname(abspath(__file__)))
+    sys.path.insert(0, libdir)
+
+from argparse import ArgumentParser
+import json
+import os
+import sqlite3
+
+from colomoto.minibn import BooleanNetwork
+
+from bntaxonomy.utils.log import main_logger
+from bntaxonomy.utils.process import STATUS_OK
+
+DEFAULT_RESULTS_ROOT = "experiments/results"
+STORE_FILE = "results.sqlite"
+
+# bumped when the schema changes: older stores are rebuilt empty, to be
+# refilled from the result folders (see `main`)
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    grp TEXT NOT NULL,
+    name TEXT NOT NULL,
+    nodes TEXT NOT NULL,
+    PRIMARY KEY (grp, name)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    grp TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    status TEXT NOT NULL,
+    time REAL,
+    message TEXT,
+    key TEXT,
+    n_controls INTEGER,
+    PRIMARY KEY (grp, instance, tool),
+    FOREIGN KEY (grp, instance) REFERENCES instances (grp, name) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS controls (
+    grp TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    ctrl TEXT NOT NULL,
+    PRIMARY KEY (grp, instance, tool, idx),
+    FOREIGN KEY (grp, instance, tool) REFERENCES runs (grp, instance, tool) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS instances_by_name ON instances (name);
+CREATE INDEX IF NOT EXISTS runs_by_instance ON runs (instance, tool);
+CREATE INDEX IF NOT EXISTS runs_by_tool ON runs (tool, grp, instance);
+CREATE INDEX IF NOT EXISTS controls_by_instance ON controls (instance, tool, idx);
+CREATE INDEX IF NOT EXISTS controls_by_tool ON controls (tool, grp, instance);
+"""
+
+
+def default_store(results_root: str = DEFAULT_RESULTS_ROOT) -> str:
+    """Path of the result store of the result folders under `results_root`."""
+    return os.path.join(results_root, STORE_FILE)
+
+
+def _in(column: str, values: list[str]) -> tuple[str, list[str]]:
+    return f"{column} IN ({','.join('?' * len(values))})", list(values)
+
+
+def read_result_folder(opath: str) -> tuple[dict[str, list], dict[str, dict]]:
+    """Reads the results written by `ExperimentHandler` in `opath`.
+
+    Returns:
+        tuple[dict[str, list], dict[str, dict]]: the minimal controls of each tool
+        that finished, and the content of the status file of each tool, if any.
+    """
+    fnames = os.listdir(opath)
+    status = dict()
+    for fname in fnames:
+        if fname.endswith("_status.json"):
+            with open(f"{opath}/{fname}") as _f:
+                status[fname[: -len("_status.json")]] = json.load(_f)
+    results = dict()
+    for fname in fnames:
+        if (
+            fname.endswith(".json")
+            and not fname.endswith("_full.json")
+            and not fname.endswith("_status.json")
+            and status.get(fname[:-5], {}).get("status", STATUS_OK) == STATUS_OK
+        ):
+            with open(f"{opath}/{fname}") as _f:
+                results[fname[:-5]] = json.load(_f)
+    return results, status
+
+
+class ResultStore:
+    """SQLite store of the results of a sweep.
+
+    It holds the group and the nodes of each instance, and the status, the
+    running time and the minimal controls of each (instance, tool) run, so that
+    summaries are loaded with a few bulk queries instead of opening every result
+    file and parsing every network.
+    """
+
+    def __init__(self, fname: str | None = None) -> None:
+        fname = fname or default_store()
+        os.makedirs(os.path.dirname(fname) or ".", exist_ok=True)
+        self.fname = fname
+        self.conn = sqlite3.connect(fname)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            if version:
+                main_logger.warning(
+                    f"{fname}: outdated result store, emptied (rebuild it with store.py)"
+                )
+            with self.conn:
+                for table in ("controls", "runs", "instances"):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def put_instance(self, name: str, group: str, nodes: list[str]):
+        with self.conn:
+            self._put_instance(name, group, nodes)
+
+    def _put_instance(self, name, group, nodes):
+        # an upsert, as replacing the row would delete the runs of the instance
+        self.conn.execute(
+            "INSERT INTO instances VALUES (?, ?, ?)"
+            " ON CONFLICT (grp, name) DO UPDATE SET nodes = excluded.nodes",
+            (group, name, json.dumps(nodes)),
+        )
+
+    def put_run(
+        self,
+        group: str,
+        instance: str,
+        tool: str,
+        status: str = STATUS_OK,
+        time: float | None = None,
+        message: str = "",
+        key: str | None = None,
+        d_list: list[dict[str, int]] | None = None,
+    ):
+        with self.conn:
+            self._put_run(group, instance, tool, status, time, message, key, d_list)
+
+    def _put_run(self, group, instance, tool, status, time, message, key, d_list):
+        # the controls of a previous run are deleted with it (ON DELETE CASCADE)
+        self.conn.execute(
+            "DELETE FROM runs WHERE grp = ? AND instance = ? AND tool = ?",
+            (group, instance, tool),
+        )
+        self.conn.execute(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                group,
+                instance,
+                tool,
+                status,
+                time,
+                message,
+                key,
+                None if d_list is None else len(d_list),
+            ),
+        )
+        self.conn.executemany(
+            "INSERT INTO controls VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (group, instance, tool, idx, len(ctrl), json.dumps(ctrl))
+                for idx, ctrl in enumerate(d_list or [])
+            ),
+        )
+
+    def import_folder(self, opath: str, name: str, group: str, nodes: list[str]):
+        """Stores (or replaces) the results of an instance written in `opath`."""
+        results, status = read_result_folder(opath)
+        with self.conn:
+            self._put_instance(name, group, nodes)
+            self.conn.execute(
+                "DELETE FROM runs WHERE grp = ? AND instance = ?", (group, name)
+            )
+            for tool in sorted(set(results) | set(status)):
+                st = status.get(tool, {})
+                self._put_run(
+                    group,
+                    name,
+                    tool,
+                    st.get("status", STATUS_OK),
+                    st.get("time"),
+                    st.get("message", ""),
+                    st.get("key"),
+                    results.get(tool),
+                )
+
+    def import_results(self, results_root: str = DEFAULT_RESULTS_ROOT):
+        """Stores every instance found under `results_root`, i.e., `{group}/{instance}`.
+
+        The networks are read from the matching `instances` folder.
+        """
+        instances_root = results_root.replace("results", "instances")
+        for group in sorted(os.listdir(results_root)):
+            if not os.path.isdir(f"{results_root}/{group}"):
+                continue
+            for name in sorted(os.listdir(f"{results_root}/{group}")):
+                opath = f"{results_root}/{group}/{name}"
+                if not os.path.isdir(opath):
+                    continue
+                bn = BooleanNetwork.load(
+                    f"{instances_root}/{group}/{name}/transition_formula.bnet"
+                )
+                self.import_folder(opath, name, group, list(bn.keys()))
+
+    def read(
+        self,
+        groups: list[str] | None = None,
+        instances: list[str] | None = None,
+        tools: list[str] | None = None,
+    ) -> dict[tuple[str, str], dict]:
+        """Loads the stored instances, optionally restricted to some groups,
+        instance names or tools. The selection is done by the queries.
+
+        Returns:
+            dict[tuple[str, str], dict]: for each (group, instance), in this
+            order, its `nodes`, the `status` of each tool, and the `results`
+            (list of controls) of each tool that finished.
+        """
+        cond, params = list(), list()
+        for column, values in (("grp", groups), ("name", instances)):
+            if values is not None:
+                c, p = _in(f"i.{column}", values)
+                cond.append(c)
+                params.extend(p)
+        run_cond, run_params = list(cond), list(params)
+        if tools is not None:
+            c, p = _in("r.tool", tools)
+            run_cond.append(c)
+            run_params.extend(p)
+
+        def where(conds):
+            return " WHERE " + " AND ".join(conds) if conds else ""
+
+        data = dict()
+        for group, name, nodes in self.conn.execute(
+            f"SELECT i.grp, i.name, i.nodes FROM instances i{where(cond)}"
+            " ORDER BY i.grp, i.name",
+            params,
+        ):
+            data[group, name] = {
+                "group": group,
+                "nodes": json.loads(nodes),
+                "status": dict(),
+                "results": dict(),
+            }
+        join = "JOIN instances i ON i.grp = r.grp AND i.name = r.instance"
+        for group, instance, tool, status, n_controls in self.conn.execute(
+            f"SELECT r.grp, r.instance, r.tool, r.status, r.n_controls FROM runs r {join}"
+            f"{where(run_cond)} ORDER BY r.grp, r.instance, r.tool",
+            run_params,
+        ):
+            data[group, instance]["status"][tool] = status
+            if status == STATUS_OK and n_controls is not None:
+                data[group, instance]["results"][tool] = list()
+        for group, instance, tool, ctrl in self.conn.execute(
+            "SELECT c.grp, c.instance, c.tool, c.ctrl FROM controls c"
+            " JOIN runs r ON r.grp = c.grp AND r.instance = c.instance AND r.tool = c.tool"
+            f" {join}{where(run_cond + ['r.status = ?'])}"
+            " ORDER BY c.grp, c.instance, c.tool, c.idx",
+            run_params + [STATUS_OK],
+        ):
+            data[group, instance]["results"][tool].append(json.loads(ctrl))
+        return data
+
+
+def main(argv=None):
+    ap = ArgumentParser(
+        description="(Re)build the result store from the result folders."
+    )
+    ap.add_argument(
+        "-r",
+        "--results",
+        help=f"Root of the result folders (default: {DEFAULT_RESULTS_ROOT}).",
+        default=DEFAULT_RESULTS_ROOT,
+    )
+    ap.add_argument(
+        "--store",
+        help=f"Result store to write (default: {STORE_FILE} in the root of the result folders).",
+        default=None,
+    )
+    args = ap.parse_args(argv)
+    with ResultStore(args.store or default_store(args.results)) as store:
+        store.import_results(args.results)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ import argparse
 import json
 import os
 from bntaxonomy.hierarchy import MultiInputSummary
+from bntaxonomy.store import ResultStore
 
 
 def main(argv=None):
@@ -26,11 +27,31 @@ def main(argv=None):
         help="Explicit instance folders (under 'instances').",
         default=None,
     )
+    parser.add_argument(
+        "--store",
+        help="Read the results from this result store (see bntaxonomy/store.py) instead of the result folders.",
+        default=None,
+    )
 
     args = parser.parse_args(argv)
 
     # Determine summary source: priority: explicit args > defaults from automate_test
-    if args.inst_groups:
+    if args.store:
+        with ResultStore(args.store) as store:
+            hc = MultiInputSummary.from_store(
+                store,
+                groups=(
+                    [os.path.basename(p.rstrip("/")) for p in args.inst_groups]
+                    if args.inst_groups
+                    else None
+                ),
+                instances=(
+                    [os.path.basename(p.rstrip("/")) for p in args.instances]
+                    if args.instances
+                    else None
+                ),
+            )
+    elif args.inst_groups:
         inst_groups = [p.replace("instances", "results") for p in args.inst_groups]
         hc = MultiInputSummary.from_inst_groups(inst_groups, "Hierarchy")
     elif args.instances:
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Synthetic Boolean networks of scalable size, to stress the tools and the
+analysis pipeline.
+
+    python src/bntaxonomy/synthetic.py -o experiments/instances/S_synthetic --sizes 100 300 1000 3000
+
+Networks are drawn from a seed, so that a size ladder can be regenerated
+identically on any machine.
+"""
+if __name__ == "__main__":
+    import sys
+    from os.path import dirname, abspath
+
+    libdir = dirname(dirname(abspath(__file__)))
+    sys.path.insert(0, libdir)
+
+from argparse import ArgumentParser
+from itertools import combinations
+import json
+import os
+
+import numpy as np
+
+TOPOLOGIES = ("random", "scale-free")
+FUNCTION_CLASSES = ("and_or", "canalizing", "threshold", "random")
+MAX_INDEGREE = 8  # truth tables of the local functions have 2^k rows
+
+
+class SyntheticBN:
+    """A Boolean network on the nodes `x1`..`xn`.
+
+    The local function of a node is given both as a formula and as a truth
+    table over its regulators: row `r` of `tables[i]` is the value of node
+    `i` when bit `j` of `r` is the value of `regulators[i][j]`. Input nodes
+    have no regulators and keep their value (`x = x`).
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        regulators: list[np.ndarray],
+        tables: list[np.ndarray],
+        formulas: list[str],
+        inputs: list[int],
+    ):
+        self.names = names
+        self.regulators = regulators
+        self.tables = tables
+        self.formulas = formulas
+        self.inputs = inputs
+        # padded copies, to evaluate the functions of several nodes at once
+        kmax = max([len(r) for r in regulators] + [1])
+        n = len(names)
+        self._regs = np.zeros((n, kmax), dtype=np.int64)
+        self._mask = np.zeros((n, kmax), dtype=bool)
+        self._tables = np.zeros((n, 2**kmax), dtype=np.uint8)
+        for i, (regs, tt) in enumerate(zip(regulators, tables)):
+            self._regs[i, : len(regs)] = regs
+            self._mask[i, : len(regs)] = True
+            # rows of the padded table ignore the bits of the padding
+            self._tables[i] = np.resize(tt, 2**kmax)
+        for i in inputs:
+            self._regs[i, 0] = i
+            self._mask[i, 0] = True
+            self._tables[i] = np.arange(2**kmax) & 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def eval_nodes(self, states: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """Values of `nodes[r]` updated in `states[r]`, for every row `r`."""
+        regs = self._regs[nodes]
+        bits = np.take_along_axis(states, regs, axis=1) & self._mask[nodes]
+        rows = (bits.astype(np.int64) << np.arange(regs.shape[1])).sum(axis=1)
+        return self._tables[nodes, rows]
+
+    def to_bnet(self) -> str:
+        lines = ["targets, factors"]
+        for name, formula in zip(self.names, self.formulas):
+            lines.append(f"{name}, {formula}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------------------------------
+# Topologies
+# ---------------------------------
+def draw_indegrees(rng: np.random.Generator, n: int, kmin: int, kmax: int) -> np.ndarray:
+    return rng.integers(kmin, kmax + 1, size=n)
+
+
+def draw_regulators(
+    rng: np.random.Generator, n: int, indegrees: np.ndarray, topology: str, gamma: float
+) -> list[np.ndarray]:
+    """Regulators of every node, without self-loops.
+
+    With the `scale-free` topology, the regulators are drawn with probability
+    proportional to `i^(-1/(gamma-1))` (static model of Goh et al.), which
+    gives out-degrees following a power law of exponent `gamma`.
+    """
+    if topology == "random":
+        weights = np.ones(n)
+    elif topology == "scale-free":
+        weights = np.arange(1, n + 1, dtype=float) ** (-1 / (gamma - 1))
+        weights = weights[rng.permutation(n)]
+    else:
+        raise ValueError(f"Unknown topology '{topology}'")
+    regulators = list()
+    for i, k in enumerate(indegrees):
+        p = weights.copy()
+        p[i] = 0
+        p /= p.sum()
+        regulators.append(np.sort(rng.choice(n, size=min(k, n - 1), replace=False, p=p)))
+    return regulators
+
+
+# ---------------------------------
+# Function classes
+# ---------------------------------
+def _lit(name: str, value: int) -> str:
+    return name if value else f"!{name}"
+
+
+def _inputs_table(k: int) -> np.ndarray:
+    """(2^k, k) matrix of the values of the regulators in every row."""
+    return (np.arange(2**k)[:, None] >> np.arange(k)) & 1
+
+
+def and_or_function(rng: np.random.Generator, names: list[str]):
+    """Conjunction or disjunction of literals."""
+    X = _inputs_table(len(names))
+    signs = rng.integers(0, 2, size=len(names))
+    lits = X == signs
+    if rng.integers(0, 2):
+        return " & ".join(map(_lit, names, signs)), lits.all(axis=1)
+    return " | ".join(map(_lit, names, signs)), lits.any(axis=1)
+
+
+def canalizing_function(rng: np.random.Generator, names: list[str]):
+    """Nested canalizing function: if the j-th regulator (in a random order)
+    takes its canalizing value, the node takes the j-th canalized value."""
+    k = len(names)
+    X = _inputs_table(k)
+    order = rng.permutation(k)
+    inputs = rng.integers(0, 2, size=k)
+    outputs = rng.integers(0, 2, size=k)
+    j = order[-1]
+    formula = _lit(names[j], inputs[-1] == outputs[-1])
+    tt = (X[:, j] == inputs[-1]) == outputs[-1]
+    for j, a, b in zip(order[-2::-1], inputs[-2::-1], outputs[-2::-1]):
+        formula = f"({formula})" if " " in formula else formula
+        if b:
+            formula = f"{_lit(names[j], a)} | {formula}"
+            tt = (X[:, j] == a) | tt
+        else:
+            formula = f"{_lit(names[j], 1 - a)} & {formula}"
+            tt = (X[:, j] != a) & tt
+    return formula, tt
+
+
+def threshold_function(rng: np.random.Generator, names: list[str]):
+    """The node is active if it has strictly more active activators than
+    active inhibitors (at least one regulator is an activator).
+
+    The function is unate: its prime implicants are the sets of
+    `n_inhibitors + 1` literals (activators on, inhibitors off).
+    """
+    k = len(names)
+    X = _inputs_table(k)
+    signs = rng.integers(0, 2, size=k)
+    signs[rng.integers(0, k)] = 1
+    weights = 2 * signs - 1
+    tt = (X * weights).sum(axis=1) > 0
+    n_inh = int(k - signs.sum())
+    terms = [
+        " & ".join(_lit(names[j], signs[j]) for j in subset)
+        for subset in combinations(range(k), n_inh + 1)
+    ]
+    if len(terms) == 1:
+        return terms[0], tt
+    return " | ".join(f"({t})" if " " in t else t for t in terms), tt
+
+
+def random_function(rng: np.random.Generator, names: list[str]):
+    """Uniformly random non-constant truth table, as a DNF of its minterms."""
+    k = len(names)
+    X = _inputs_table(k)
+    tt = rng.integers(0, 2, size=2**k).astype(bool)
+    tt[rng.choice(2**k, size=2, replace=False)] = [False, True]
+    terms = [" & ".join(map(_lit, names, X[r])) for r in np.flatnonzero(tt)]
+    return " | ".join(f"({t})" if " " in t else t for t in terms), tt
+
+
+FUNCTIONS = {
+    "and_or": and_or_function,
+    "canalizing": canalizing_function,
+    "threshold": threshold_function,
+    "random": random_function,
+}
+
+
+def random_bn(
+    n: int,
+    seed: int = 0,
+    topology: str = "scale-free",
+    kmin: int = 1,
+    kmax: int = 3,
+    functions: dict[str, float] | None = None,
+    n_inputs: int = 0,
+    gamma: float = 2.5,
+) -> SyntheticBN:
+    """Draws a Boolean network of `n` nodes, of which the first `n_inputs` are
+    inputs, the other nodes having between `kmin` and `kmax` regulators.
+
+    `functions` gives the relative frequency of each function class
+    (default: equal frequencies of `and_or`, `canalizing` and `threshold`).
+    """
+    if not 1 <= kmin <= kmax <= MAX_INDEGREE:
+        raise ValueError(f"In-degrees must be within [1, {MAX_INDEGREE}]")
+    if n < 2:
+        raise ValueError("The network needs at least two nodes")
+    if not 0 <= n_inputs < n:
+        raise ValueError("The network needs at least one node besides the inputs")
+    if functions is None:
+        functions = {"and_or": 1, "canalizing": 1, "threshold": 1}
+    unknown = set(functions) - set(FUNCTIONS)
+    if unknown:
+        raise ValueError(f"Unknown function classes: {sorted(unknown)}")
+    rng = np.random.default_rng(seed)
+    names = [f"x{i}" for i in range(1, n + 1)]
+    indegrees = draw_indegrees(rng, n, kmin, kmax)
+    indegrees[:n_inputs] = 0
+    regulators = draw_regulators(rng, n, indegrees, topology, gamma)
+    classes = list(functions)
+    p = np.array([functions[c] for c in classes], dtype=float)
+    drawn = rng.choice(len(classes), size=n, p=p / p.sum())
+    tables, formulas = list(), list()
+    for i, regs in enumerate(regulators):
+        if i < n_inputs:
+            formula, tt = names[i], np.array([0, 1])
+        else:
+            func = FUNCTIONS[classes[drawn[i]]]
+            formula, tt = func(rng, [names[j] for j in regs])
+        tables.append(np.asarray(tt, dtype=np.uint8))
+        formulas.append(formula)
+    return SyntheticBN(names, regulators, tables, formulas, list(range(n_inputs)))
+
+
+# ---------------------------------
+# Target phenotypes
+# ---------------------------------
+def asynchronous_walks(
+    bn: SyntheticBN,
+    rng: np.random.Generator,
+    inputs: dict[int, int],
+    n_walks: int = 64,
+    sweeps: int = 20,
+) -> np.ndarray:
+    """Final states of `n_walks` fully asynchronous trajectories from random
+    initial states (with the inputs fixed), each of `sweeps * n` updates of a
+    random node."""
+    n = len(bn)
+    states = rng.integers(0, 2, size=(n_walks, n)).astype(np.uint8)
+    for i, v in inputs.items():
+        states[:, i] = v
+    rows = np.arange(n_walks)
+    for _ in range(sweeps * n):
+        nodes = rng.integers(0, n, size=n_walks)
+        states[rows, nodes] = bn.eval_nodes(states, nodes)
+    return states
+
+
+def reachable_target(
+    bn: SyntheticBN,
+    rng: np.random.Generator,
+    inputs: dict[int, int],
+    n_targets: int = 1,
+    **kwargs,
+) -> dict[int, int]:
+    """A phenotype reached by an asynchronous trajectory of the network.
+
+    The target nodes are preferably taken among the nodes whose value differs
+    between the final states of the trajectories, so that the phenotype is
+    not reached from every initial state.
+    """
+    states = asynchronous_walks(bn, rng, inputs, **kwargs)
+    candidates = np.array([i for i in range(len(bn)) if i not in bn.inputs])
+    varying = candidates[(states[:, candidates] != states[0, candidates]).any(axis=0)]
+    fixed = np.setdiff1d(candidates, varying)
+    order = np.concatenate([rng.permutation(varying), rng.permutation(fixed)])
+    nodes = order[:n_targets]
+    state = states[rng.integers(0, len(states))]
+    return {int(i): int(state[i]) for i in sorted(nodes)}
+
+
+# ---------------------------------
+# Instances
+# ---------------------------------
+def instance_seed(seed: int, size: int, replicate: int) -> int:
+    """Seed of an instance of the ladder, independent of the other sizes."""
+    return int(np.random.SeedSequence([seed, size, replicate]).generate_state(1)[0])
+
+
+def generate_instance(
+    fpath: str,
+    n: int,
+    seed: int = 0,
+    n_inputs: int = 0,
+    n_targets: int = 1,
+    **kwargs,
+) -> SyntheticBN:
+    """Writes an instance folder (`transition_formula.bnet`, `setting.json`)
+    of a random network (see `random_bn`), with random input values and a
+    reachable target phenotype."""
+    bn_seq, target_seq = np.random.SeedSequence(seed).spawn(2)
+    bn = random_bn(n, bn_seq, n_inputs=n_inputs, **kwargs)
+    rng = np.random.default_rng(target_seq)
+    inputs = {i: int(v) for i, v in zip(bn.inputs, rng.integers(0, 2, size=n_inputs))}
+    target = reachable_target(bn, rng, inputs, n_targets)
+    os.makedirs(fpath, exist_ok=True)
+    with open(f"{fpath}/transition_formula.bnet", "w") as _f:
+        _f.write(bn.to_bnet())
+    with open(f"{fpath}/setting.json", "w") as _f:
+        json.dump(
+            {
+                "inputs": {bn.names[i]: v for i, v in inputs.items()},
+                "target": {bn.names[i]: v for i, v in target.items()},
+            },
+            _f,
+            indent=4,
+        )
+    return bn
+
+
+def main(argv=None):
+    ap = ArgumentParser(description="Generate a ladder of synthetic instances.")
+    ap.add_argument("-o", "--output", required=True, help="Instance-group directory to write.")
+    ap.add_argument("--sizes", type=int, nargs="+", required=True, help="Numbers of nodes.")
+    ap.add_argument("--replicates", type=int, default=1, help="Instances per size.")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--topology", choices=TOPOLOGIES, default="scale-free")
+    ap.add_argument("--gamma", type=float, default=2.5, help="Exponent of the scale-free out-degrees.")
+    ap.add_argument("--kmin", type=int, default=1, help="Minimum in-degree.")
+    ap.add_argument("--kmax", type=int, default=3, help="Maximum in-degree.")
+    ap.add_argument(
+        "--functions",
+        nargs="+",
+        default=["and_or", "canalizing", "threshold"],
+        help=f"Function classes among {', '.join(FUNCTION_CLASSES)}, optionally weighted as CLASS:WEIGHT.",
+    )
+    ap.add_argument("--inputs", type=int, default=0, help="Number of input nodes.")
+    ap.add_argument("--targets", type=int, default=1, help="Number of nodes of the target phenotype.")
+    args = ap.parse_args(argv)
+
+    functions = dict()
+    for spec in args.functions:
+        name, _, weight = spec.partition(":")
+        if name not in FUNCTION_CLASSES:
+            ap.error(f"Unknown function class '{name}'")
+        functions[name] = float(weight or 1)
+
+    for size in args.sizes:
+        for rep in range(args.replicates):
+            name = f"S_{args.topology}_n{size}_r{rep}"
+            generate_instance(
+                os.path.join(args.output, name),
+                size,
+                instance_seed(args.seed, size, rep),
+                n_inputs=args.inputs,
+                n_targets=args.targets,
+                topology=args.topology,
+                kmin=args.kmin,
+                kmax=args.kmax,
+                functions=functions,
+                gamma=args.gamma,
+            )
+            print(name)
+
+
+if __name__ == "__main__":
+    main()
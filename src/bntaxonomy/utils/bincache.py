@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from typing import Iterable, Mapping
+
+import numpy as np
+
+from bntaxonomy.utils.cache import atomic_write
+from bntaxonomy.utils.log import main_logger
+
+# A binary cache file is made of
+#   - a fixed header: magic, format version, kind of content and the SHA-256
+#     digest of the model the content was computed from,
+#   - a JSON block with the metadata and the layout of the arrays,
+#   - the raw (8-byte aligned) arrays, which are memory-mapped on load.
+MAGIC = b"BNTXBIN\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sH6s32sQ")
+_ALIGN = 8
+
+
+def _padding(n: int) -> bytes:
+    return b"\x00" * (-n % _ALIGN)
+
+
+def write_bincache(
+    fname: str, kind: str, digest: str, meta: dict, arrays: dict[str, np.ndarray]
+):
+    """Writes `arrays` and `meta` to `fname`, tagged with the model `digest`."""
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    layout = []
+    offset = 0
+    for name, arr in arrays.items():
+        layout.append(
+            {"name": name, "dtype": arr.dtype.str, "shape": arr.shape, "offset": offset}
+        )
+        offset += arr.nbytes + len(_padding(arr.nbytes))
+    meta_bytes = json.dumps({"meta": meta, "arrays": layout}).encode()
+
+    with atomic_write(fname, "wb") as _f:
+        _f.write(
+            _HEADER.pack(
+                MAGIC, FORMAT_VERSION, kind.encode(), bytes.fromhex(digest), len(meta_bytes)
+            )
+        )
+        _f.write(meta_bytes)
+        _f.write(_padding(_HEADER.size + len(meta_bytes)))
+        for arr in arrays.values():
+            _f.write(arr.tobytes())
+            _f.write(_padding(arr.nbytes))
+
+
+def read_bincache(
+    fname: str, kind: str, digest: str
+) -> tuple[dict, dict[str, np.ndarray]] | None:
+    """Metadata and (read-only, memory-mapped) arrays of `fname`.
+
+    Returns None if the file is missing, has another format or was computed
+    from another model than the one of `digest`.
+    """
+    if not fname or not os.path.isfile(fname):
+        return None
+    try:
+        with open(fname, "rb") as _f:
+            buf = mmap.mmap(_f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(buf) < _HEADER.size:
+        main_logger.info(f"Ignoring truncated cache {fname}")
+        return None
+    magic, version, _kind, _digest, meta_len = _HEADER.unpack_from(buf)
+    if magic != MAGIC or version != FORMAT_VERSION or _kind.rstrip(b"\x00") != kind.encode():
+        main_logger.info(f"Ignoring cache {fname} of an unknown format")
+        return None
+    if _digest != bytes.fromhex(digest):
+        main_logger.info(f"Ignoring stale cache {fname} of another model")
+        return None
+
+    start = _HEADER.size + meta_len
+    try:
+        header = json.loads(buf[_HEADER.size : start])
+        start += len(_padding(start))
+        arrays = dict()
+        for a in header["arrays"]:
+            shape = tuple(a["shape"])
+            arr = np.frombuffer(
+                buf, dtype=a["dtype"], count=int(np.prod(shape)), offset=start + a["offset"]
+            )
+            arrays[a["name"]] = arr.reshape(shape)
+    except (ValueError, KeyError):
+        main_logger.info(f"Ignoring corrupted cache {fname}")
+        return None
+    return header["meta"], arrays
+
+
+def pack_states(
+    states: Iterable[Mapping[str, int | str]], nodes: list[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Packs partial states into bit-vectors over `nodes`.
+
+    Returns the packed values and the packed mask of fixed nodes, one row per
+    state. Nodes that are missing or not set to 0/1 (e.g. "*") are free.
+    """
+    index = {node: i for i, node in enumerate(nodes)}
+    states = list(states)
+    value = np.zeros((len(states), len(nodes)), dtype=bool)
+    fixed = np.zeros((len(states), len(nodes)), dtype=bool)
+    for row, state in enumerate(states):
+        for node, v in state.items():
+            if v in (0, 1):
+                fixed[row, index[node]] = True
+                value[row, index[node]] = v
+    return np.packbits(value, axis=1), np.packbits(fixed, axis=1)
+
+
+def unpack_states(
+    value: np.ndarray, fixed: np.ndarray, nodes: list[str], free: str | None = None
+) -> list[dict[str, int | str]]:
+    """Inverse of `pack_states`.
+
+    Free nodes are omitted if `free` is None, and set to `free` otherwise.
+    """
+    value = np.unpackbits(value, axis=1, count=len(nodes))
+    fixed = np.unpackbits(fixed, axis=1, count=len(nodes))
+    if free is None:
+        # sparse states (e.g. prime implicants): only visit the fixed nodes
+        states = [dict() for _ in range(len(fixed))]
+        rows, cols = np.nonzero(fixed)
+        for row, col, v in zip(rows.tolist(), cols.tolist(), value[rows, cols].tolist()):
+            states[row][nodes[col]] = v
+        return states
+    return [
+        {n: v if f else free for n, v, f in zip(nodes, vrow, frow)}
+        for vrow, frow in zip(value.tolist(), fixed.tolist())
+    ]
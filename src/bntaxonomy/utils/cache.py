@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import tempfile
+
+
+@contextlib.contextmanager
+def atomic_write(fname: str, mode: str = "w"):
+    """Write `fname` through a temporary file that is renamed on success.
+
+    Concurrent readers never observe a partially written cache file, and
+    concurrent writers of the same file simply replace each other.
+    """
+    dirname = os.path.dirname(fname) or "."
+    fd, tmp_fname = tempfile.mkstemp(
+        dir=dirname, prefix=f".{os.path.basename(fname)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode) as _f:
+            yield _f
+        os.replace(tmp_fname, fname)
+    except BaseException:
+        if os.path.exists(tmp_fname):
+            os.remove(tmp_fname)
+        raise
+
+
+def file_digest(fname: str) -> str:
+    """SHA-256 hex digest of the content of `fname`."""
+    h = hashlib.sha256()
+    with open(fname, "rb") as _f:
+        for chunk in iter(lambda: _f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
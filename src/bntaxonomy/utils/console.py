@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+
+DEFAULT_TAIL_BYTES = 64 * 1024
+
+# Console output is captured at two levels:
+#   - Python-level writes to sys.stdout/sys.stderr are routed per thread, so
+#     that tools running concurrently in threads each get their own output;
+#   - file descriptors 1 and 2, which external binaries and C extensions
+#     write to, are process-wide: they are redirected to the file of the
+#     oldest active capture. A tool starting a subprocess from a thread can
+#     pass `console_output_file()` as its stdout/stderr to keep its output
+#     with its own capture.
+_lock = threading.Lock()
+_local = threading.local()
+_active: list[ConsoleCapture] = []
+_saved_fds: tuple[int, int] | None = None
+
+
+class _ThreadRoutedStream:
+    """Stand-in for sys.stdout/sys.stderr writing to the capture of the
+    current thread, or to the original stream outside captures."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def _target(self):
+        capture = getattr(_local, "capture", None)
+        return self._stream if capture is None else capture.file
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+
+class ConsoleCapture:
+    """Console output of a job, written to `fname` (or to an anonymous
+    temporary file). The last `tail_bytes` bytes are kept in `tail` once the
+    capture is closed, e.g. to report the output of a failed run."""
+
+    def __init__(self, fname: str | None = None, tail_bytes: int = DEFAULT_TAIL_BYTES):
+        self.fname = fname
+        self.tail_bytes = tail_bytes
+        self.tail = ""
+        if fname is None:
+            self.file = tempfile.TemporaryFile("w+", buffering=1)
+        else:
+            self.file = open(fname, "w+", buffering=1)
+
+    def close(self):
+        if self.tail_bytes and self.file.seekable():
+            self.file.flush()
+            size = self.file.seek(0, os.SEEK_END)
+            self.file.seek(max(0, size - self.tail_bytes))
+            self.tail = self.file.buffer.read().decode(errors="replace")
+        self.file.close()
+
+
+def _install_routed_streams():
+    if not isinstance(sys.stdout, _ThreadRoutedStream):
+        sys.stdout = _ThreadRoutedStream(sys.stdout)
+    if not isinstance(sys.stderr, _ThreadRoutedStream):
+        sys.stderr = _ThreadRoutedStream(sys.stderr)
+
+
+def _flush_fds():
+    for stream in (sys.__stdout__, sys.__stderr__):
+        if stream is not None:
+            stream.flush()
+    for capture in _active:
+        capture.file.flush()
+
+
+def _redirect_fds():
+    """Points fds 1 and 2 to the oldest active capture, or restores them."""
+    global _saved_fds
+    _flush_fds()
+    if _active:
+        if _saved_fds is None:
+            _saved_fds = (os.dup(1), os.dup(2))
+        target = _active[0].file.fileno()
+        os.dup2(target, 1)
+        os.dup2(target, 2)
+    elif _saved_fds is not None:
+        os.dup2(_saved_fds[0], 1)
+        os.dup2(_saved_fds[1], 2)
+        os.close(_saved_fds[0])
+        os.close(_saved_fds[1])
+        _saved_fds = None
+
+
+def console_output_file():
+    """File of the capture of the current thread, or None outside captures."""
+    capture = getattr(_local, "capture", None)
+    return None if capture is None else capture.file
+
+
+@contextlib.contextmanager
+def capture_console_output(fname: str | None = None, tail_bytes: int = DEFAULT_TAIL_BYTES):
+    """Captures the console output of the current thread to `fname`.
+
+    Captures can be nested and can run concurrently in several threads; the
+    output of each thread goes to its own capture.
+    """
+    capture = ConsoleCapture(fname, tail_bytes)
+    previous = getattr(_local, "capture", None)
+    with _lock:
+        _install_routed_streams()
+        _active.append(capture)
+        if len(_active) == 1:
+            _redirect_fds()
+    _local.capture = capture
+    try:
+        yield capture
+    finally:
+        _local.capture = previous
+        with _lock:
+            was_first = _active[0] is capture
+            _active.remove(capture)
+            if was_first:
+                _redirect_fds()
+        capture.close()
+
+
+def suppress_console_output():
+    """Discards the console output of the current thread."""
+    return capture_console_output(os.devnull, tail_bytes=0)
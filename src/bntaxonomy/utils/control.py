@@ -1,29 +1,14 @@
 from __future__ import annotations
 
-import contextlib
+from collections import defaultdict
+from itertools import chain, repeat
 from math import comb, prod
 import json
-import os
-import re
-import sys
 
-from algorecell_types import ReprogrammingStrategies
+from algorecell_types import PermanentPerturbation, ReprogrammingStrategies
+import numpy as np
 
-
-@contextlib.contextmanager
-def suppress_console_output():
-    with open(os.devnull, "w") as devnull:
-        # suppress stdout and
-        orig_stdout_fno = os.dup(sys.stdout.fileno())
-        os.dup2(devnull.fileno(), 1)
-        orig_stderr_fno = os.dup(sys.stderr.fileno())
-        os.dup2(devnull.fileno(), 2)
-        try:
-            yield
-        finally:
-            # restore
-            os.dup2(orig_stdout_fno, 1)
-            os.dup2(orig_stderr_fno, 2)
+MCS_BLOCK_BYTES = 1 << 24  # memory of the pairwise comparison computed at once
 
 
 def check_smaller(p1: dict[str, int], p2: dict[str, int], strict=False):
@@ -33,6 +18,95 @@ def check_smaller(p1: dict[str, int], p2: dict[str, int], strict=False):
     return is_small
 
 
+class LiteralEncoder:
+    """Encodes controls as integer bitmasks over (gene, value) literals.
+
+    Bits are assigned on first use, so one encoder must be shared by all the
+    controls that are compared with each other.
+    """
+
+    def __init__(self) -> None:
+        self.bits: dict[tuple[str, int], int] = dict()
+        self.literals: list[tuple[str, int]] = list()
+
+    def encode(self, ctrl: dict[str, int]) -> int:
+        mask = 0
+        for literal in ctrl.items():
+            bit = self.bits.get(literal)
+            if bit is None:
+                bit = self.bits[literal] = len(self.literals)
+                self.literals.append(literal)
+            mask |= 1 << bit
+        return mask
+
+    def decode(self, mask: int) -> dict[str, int]:
+        return dict(
+            literal for bit, literal in enumerate(self.literals) if mask >> bit & 1
+        )
+
+
+class SubsetIndex:
+    """Set of control bitmasks (see `LiteralEncoder`) with subset queries.
+
+    Masks are bucketed by size. Looking for a stored subset of a mask either
+    enumerates its submasks with hash lookups, or scans the buckets that are
+    not larger than the mask, whichever is cheaper. As controls are small, the
+    former usually answers in a few lookups regardless of the index size.
+    """
+
+    def __init__(self, masks=()) -> None:
+        self._masks: set[int] = set()
+        self._by_size: dict[int, set[int]] = defaultdict(set)
+        for mask in masks:
+            self.add(mask)
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+    def __contains__(self, mask: int) -> bool:
+        return mask in self._masks
+
+    def __iter__(self):
+        return iter(self._masks)
+
+    def add(self, mask: int):
+        self._masks.add(mask)
+        self._by_size[mask.bit_count()].add(mask)
+
+    def discard(self, mask: int):
+        if mask in self._masks:
+            self._masks.remove(mask)
+            self._by_size[mask.bit_count()].remove(mask)
+
+    def has_subset_of(self, mask: int) -> bool:
+        """Whether a stored mask is a subset of (or equal to) `mask`."""
+        size = mask.bit_count()
+        n_scan = sum(len(b) for k, b in self._by_size.items() if k <= size)
+        if n_scan == 0:
+            return False
+        if size < 64 and (1 << size) <= n_scan:
+            sub = mask
+            while True:
+                if sub in self._masks:
+                    return True
+                if sub == 0:
+                    return False
+                sub = (sub - 1) & mask
+        return any(
+            m & ~mask == 0
+            for k, bucket in self._by_size.items()
+            if k <= size
+            for m in bucket
+        )
+
+    def iter_supersets_of(self, mask: int):
+        """Stored masks that are supersets of (or equal to) `mask`."""
+        size = mask.bit_count()
+        for k, bucket in self._by_size.items():
+            if k >= size:
+                yield from (m for m in bucket if mask & ~m == 0)
+
+
 class CtrlResult:
     def __init__(self, name: str, d_list: list[dict[str, int]]) -> None:
         self.name = name
@@ -69,9 +143,16 @@ class CtrlResult:
                 )
             d[gene] = value
 
+    def masks(self, encoder: LiteralEncoder) -> list[int]:
+        return [encoder.encode(d) for d in self.d_list]
+
     def iter_ctrl_not_included_by(self, other: CtrlResult):
+        encoder = LiteralEncoder()
+        index = SubsetIndex(other.masks(encoder))
         return (
-            x for x in self.d_list if not any(check_smaller(y, x) for y in other.d_list)
+            x
+            for x, mask in zip(self.d_list, self.masks(encoder))
+            if not index.has_subset_of(mask)
         )
 
     def is_stronger_than(self, other: CtrlResult) -> bool:
@@ -90,9 +171,13 @@ class CtrlResult:
 
     def drop_nonminimal(self):
         self.sort_d_list()
+        encoder = LiteralEncoder()
+        index = SubsetIndex()
         d_list = list()
         for ctrl in self.d_list:
-            if not any(True for other in d_list if check_smaller(other, ctrl)):
+            mask = encoder.encode(ctrl)
+            if not index.has_subset_of(mask):
+                index.add(mask)
                 d_list.append(ctrl)
         self.d_list = d_list
 
@@ -142,17 +227,162 @@ class CtrlResult:
             ctrl_list,
         )
 
+    def compute_mutation_scores(
+        self, literals: list[tuple[str, int]], bn_size: int
+    ) -> dict[tuple[str, int], float]:
+        """Computes the mutation scores of several (gene, value) literals at once.
+
+        Equivalent to calling `compute_mutation_score` for each literal, but the
+        controls are compared once on a (controls x literals) incidence matrix:
+        a control is left out for every literal if it strictly includes another
+        control, and for the literal `L` if another control only differs from
+        it by `L`.
+
+        Args:
+            literals (list[tuple[str, int]]): (gene, value) pairs to score.
+            bn_size (int): Size of the Boolean network.
+        Returns:
+            dict[tuple[str, int], float]: Mutation score of each literal.
+        """
+        encoder = LiteralEncoder()
+        minimal = CtrlResult(self.name, self.d_list[:])
+        minimal.drop_nonminimal()
+        masks = minimal.masks(encoder)
+        for gene, value in literals:
+            encoder.encode({gene: value})
+        n_lit = len(encoder.literals)
+
+        inc = np.zeros((len(masks), n_lit), dtype=np.uint8)
+        for i, mask in enumerate(masks):
+            inc[i, [b for b in range(mask.bit_length()) if mask >> b & 1]] = 1
+        sizes = inc.sum(axis=1, dtype=np.intp)
+        # float32 copy for the BLAS products; counts below 2^24 are exact
+        incf = inc.astype(np.float32)
+
+        # conflict[a, b]: literals a and b set the same gene to different values
+        genes = np.array([gene for gene, _ in encoder.literals], dtype=object)
+        values = np.array([value for _, value in encoder.literals], dtype=object)
+        conflict = (genes[:, None] == genes[None, :]) & (
+            values[:, None] != values[None, :]
+        )
+        consistent = incf @ conflict.astype(np.float32) == 0
+
+        # dominated[i, L]: another control j satisfies C_j - C_i == {L}, so that
+        # C_j + L is a strict subset of C_i + L. By minimality, C_i - C_j != {}.
+        dominated = np.zeros(inc.shape, dtype=bool)
+        # rows compared at once, so that a block of `common` fits MCS_BLOCK_BYTES
+        block_size = max(1, MCS_BLOCK_BYTES // (incf.itemsize * max(1, len(masks))))
+        for start in range(0, len(masks), block_size):
+            common = incf[start : start + block_size] @ incf.T  # |C_i & C_j|
+            rows, cols = np.nonzero(sizes[None, :] - common == 1)
+            rows += start
+            # the single literal of C_j - C_i
+            lits = np.argmax(inc[cols] > inc[rows], axis=1)
+            dominated[rows, lits] = True
+
+        counted = consistent & ~dominated
+        new_sizes = (sizes[:, None] + 1 - inc).astype(np.intp)
+        weights = dict()
+        scores = dict()
+        for gene, value in literals:
+            bit = encoder.bits[(gene, value)]
+            ctrl_sizes = new_sizes[counted[:, bit], bit]
+            counts = np.bincount(ctrl_sizes, minlength=1)
+            for size in np.nonzero(counts)[0].tolist():
+                if size not in weights:
+                    weights[size] = prod(1 / 2 / (bn_size - c) for c in range(1, size))
+            # same summation order as `compute_mutation_score`: by control size
+            scores[(gene, value)] = sum(
+                chain.from_iterable(
+                    repeat(weights[size], int(counts[size]))
+                    for size in np.nonzero(counts)[0].tolist()
+                )
+            )
+        return scores
+
+
+class CtrlSink:
+    """Appends the controls of a tool to a JSON-lines file as they are produced.
+
+    Controls larger than `size_limit` are skipped, and with `only_minimal`, so
+    are the controls including an already written one. A control written
+    before one of its subsets is only dropped by `CtrlResult.drop_nonminimal`
+    once the file is read back, so memory is bounded by the written controls
+    and the file is a usable partial result if the tool is interrupted.
+    """
+
+    def __init__(
+        self, fname: str, size_limit: int | None = None, only_minimal: bool = False
+    ) -> None:
+        self.fname = fname
+        self.size_limit = size_limit
+        self.only_minimal = only_minimal
+        self.count = 0
+        self._encoder = LiteralEncoder()
+        self._index = SubsetIndex()
+        self._f = open(fname, "w", buffering=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, ctrl: dict[str, int]) -> bool:
+        """Writes `ctrl` unless it is filtered out, and tells whether it was."""
+        if self.size_limit is not None and len(ctrl) > self.size_limit:
+            return False
+        if self.only_minimal:
+            mask = self._encoder.encode(ctrl)
+            if self._index.has_subset_of(mask):
+                return False
+            self._index.add(mask)
+        self._f.write(json.dumps(dict(sorted(ctrl.items()))) + "\n")
+        self.count += 1
+        return True
+
+    def close(self):
+        self._f.close()
+
+    @staticmethod
+    def iter_file(fname: str):
+        with open(fname) as _f:
+            for line in _f:
+                if line.strip():
+                    yield json.loads(line)
+
+    @classmethod
+    def load(cls, name: str, fname: str) -> CtrlResult:
+        return CtrlResult(name, list(cls.iter_file(fname)))
+
+    @classmethod
+    def convert(cls, fname: str, json_fname: str):
+        """Writes the controls of a sink file as a JSON list, one at a time."""
+        with open(json_fname, "w") as _f:
+            _f.write("[")
+            for i, ctrl in enumerate(cls.iter_file(fname)):
+                _f.write((", " if i else "") + json.dumps(ctrl))
+            _f.write("]")
+
+
+def iter_perturbations(s: ReprogrammingStrategies):
+    """Yields the permanent perturbations of reprogramming strategies as controls.
+
+    Each distinct perturbation sequence is visited once, as in
+    `ReprogrammingStrategies.perturbations`, and each of its permanent
+    perturbations is one control. Strategies are read as they are stored,
+    without building their string representation.
+    """
+    seen = set()
+    for strategy, _props in s:
+        sequence = strategy.perturbation_sequence()
+        if sequence in seen:
+            continue
+        seen.add(sequence)
+        for perturbation in sequence:
+            if isinstance(perturbation, PermanentPerturbation):
+                yield {k: int(v) for k, v in perturbation.args[0].items()}
+
 
 def refine_pert(s: ReprogrammingStrategies):
-    text = str(s.perturbations())
-    d_list = []
-    pattern = re.compile(r"PermanentPerturbation\(([^)]*)\)")
-    for match in pattern.findall(text):
-        d = dict()
-        for item in match.split(", "):
-            if "=" not in item:
-                continue
-            k, v = item.split("=")
-            d[k] = int(v)
-        d_list.append(d)
-    return d_list
+    return list(iter_perturbations(s))
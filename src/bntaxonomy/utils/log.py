@@ -2,6 +2,8 @@ from functools import wraps
 import logging
 import time
 
+from bntaxonomy.utils.trace import span
+
 
 main_logger = logging.getLogger("time_check")  # logger
 main_logger.setLevel(logging.INFO)
@@ -17,11 +19,17 @@ def configure_logging(name: str):
 
 
 
-def time_check(func):
+def time_check(func=None, *, phase: str | None = None):
+    """Logs the time of each call of `func` and records it as a span of the
+    trace (see `bntaxonomy.utils.trace`), in `phase` if given."""
+    if func is None:
+        return lambda func: time_check(func, phase=phase)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         start = time.perf_counter()
-        result = func(*args, **kwargs)
+        with span(func.__qualname__, phase):
+            result = func(*args, **kwargs)
         end = time.perf_counter()
         main_logger.info(f"{func.__qualname__:60} in {end-start:>7.3f}" + "s")
         return result
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from bntaxonomy.utils.bincache import pack_states, read_bincache, unpack_states, write_bincache
+from bntaxonomy.utils.cache import file_digest
+from bntaxonomy.utils.log import main_logger, time_check
+from bntaxonomy.utils.trace import PHASE_PRIMES, span
+
+PRIME_BIN_FILE = "primes.bin"
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Rough footprint of one literal of a prime implicant (dict slot, key and
+# value references) and of one implicant dict, used to bound the cache.
+_LITERAL_BYTES = 100
+_IMPLICANT_BYTES = 250
+
+
+def estimate_size(primes: dict) -> int:
+    """Approximate memory footprint (in bytes) of `primes`."""
+    total = 0
+    for implicants in primes.values():
+        for side in implicants:
+            total += len(side) * _IMPLICANT_BYTES
+            total += sum(len(p) for p in side) * _LITERAL_BYTES
+    return total
+
+
+@time_check(phase=PHASE_PRIMES)
+def compute_primes(bnet_fname: str) -> dict:
+    """Prime implicants of a .bnet file in the PyBoolNet format.
+
+    PyBoolNet is used when available, pystablemotifs otherwise; both produce
+    the same {node: [off-implicants, on-implicants]} structure.
+    """
+    try:
+        from pyboolnet.file_exchange import bnet2primes
+    except ImportError:
+        import pystablemotifs as sm
+
+        return sm.format.import_primes(bnet_fname)
+    return bnet2primes(bnet_fname)
+
+
+def to_pyboolnet(primes: dict) -> dict:
+    """Canonical primes as expected by PyBoolNet.
+
+    PyBoolNet functions copy the primes before modifying them, so the shared
+    representation is returned as is.
+    """
+    return primes
+
+
+def to_stablemotifs(primes: dict) -> dict:
+    """Canonical primes as expected by pystablemotifs.
+
+    pystablemotifs uses the PyBoolNet format; a copy is returned so that the
+    shared representation is never modified by it.
+    """
+    return copy.deepcopy(primes)
+
+
+def encode_primes(primes: dict) -> tuple[dict, dict[str, np.ndarray]]:
+    """Metadata and arrays of the binary cache of `primes`.
+
+    Implicants are packed over a fixed node order, in the order of `primes`
+    and of its off- and on-implicants; `counts` gives the number of
+    implicants of each node and side.
+    """
+    implicants = [p for sides in primes.values() for s in sides for p in s]
+    nodes = sorted(set(primes).union(*implicants))
+    counts = np.array([[len(s) for s in sides] for sides in primes.values()], dtype=np.int32)
+    value, fixed = pack_states(implicants, nodes)
+    meta = {"names": list(primes), "nodes": nodes}
+    return meta, {"counts": counts.reshape(len(primes), 2), "value": value, "fixed": fixed}
+
+
+def decode_primes(meta: dict, arrays: dict[str, np.ndarray]) -> dict:
+    implicants = iter(unpack_states(arrays["value"], arrays["fixed"], meta["nodes"]))
+    primes = dict()
+    for name, (n_off, n_on) in zip(meta["names"], arrays["counts"].tolist()):
+        off = [next(implicants) for _ in range(n_off)]
+        on = [next(implicants) for _ in range(n_on)]
+        primes[name] = [off, on]
+    return primes
+
+
+def load_primes(cachedir: str, key: str) -> dict | None:
+    """Primes cached in `cachedir` for the model of digest `key`, if any."""
+    fname = os.path.join(cachedir, PRIME_BIN_FILE) if cachedir else ""
+    content = read_bincache(fname, "primes", key)
+    if content is None:
+        return None
+    main_logger.info("Loaded precomputed primes successfully")
+    return decode_primes(*content)
+
+
+def save_primes(primes: dict, cachedir: str, key: str):
+    if not cachedir:
+        return
+    try:
+        write_bincache(os.path.join(cachedir, PRIME_BIN_FILE), "primes", key, *encode_primes(primes))
+    except OSError:
+        # best-effort; the primes are still cached in memory
+        pass
+
+
+def warm_primes(bnet_fname: str, cachedir: str):
+    """Computes and saves the primes of `bnet_fname` in `cachedir`, unless
+    they are already there, so that the tools of the model only load them."""
+    key = file_digest(bnet_fname)
+    if load_primes(cachedir, key) is None:
+        with span("warm_primes", PHASE_PRIMES):
+            save_primes(compute_primes(bnet_fname), cachedir, key)
+
+
+class PrimesCache:
+    """In-process cache of prime implicants shared by all tool interfaces.
+
+    Entries are keyed by the content of the .bnet file, so that tools and
+    experiments working on the same model share a single copy. The cache keeps
+    at most `max_bytes` (estimated) of primes and evicts the least recently
+    used entries beyond that, even if their experiment is still alive: an
+    evicted entry is reloaded from the on-disk cache of the experiment, which is
+    ignored if it was computed from another version of the model.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self._exp_keys: dict[str, str] = dict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def get(self, bnet_fname: str, cachedir: str = "", expid: str | None = None) -> dict:
+        """Canonical (PyBoolNet format) primes of `bnet_fname`.
+
+        They are looked up in memory, then in `cachedir`, and computed only if
+        both miss. `expid` ties the entry to an experiment for `release`.
+        """
+        key = file_digest(bnet_fname)
+        with self._lock:
+            if expid is not None:
+                self._exp_keys[expid] = key
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        with span("PrimesCache.load", PHASE_PRIMES):
+            primes = load_primes(cachedir, key)
+            if primes is None:
+                primes = compute_primes(bnet_fname)
+                save_primes(primes, cachedir, key)
+
+        with self._lock:
+            if key not in self._entries:
+                size = estimate_size(primes)
+                self._entries[key] = (primes, size)
+                self._nbytes += size
+                self._evict(keep=key)
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def release(self, expid: str):
+        """Drop the primes of an experiment unless another experiment uses them."""
+        with self._lock:
+            key = self._exp_keys.pop(expid, None)
+            if key is None or key in self._exp_keys.values():
+                return
+            self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._exp_keys.clear()
+            self._nbytes = 0
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry[1]
+
+    def _evict(self, keep: str):
+        while self._nbytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            main_logger.info("Evicting cached primes to stay within the memory budget")
+            self._drop(key)
+
+
+primes_cache = PrimesCache()
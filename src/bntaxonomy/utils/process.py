@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import time
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_TIMEOUT = "timeout"
+STATUS_OOM = "oom"
+
+POLL_INTERVAL = 0.2  # seconds between two checks of a supervised process
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def process_group_rss(pgid: int) -> int:
+    """Total resident memory (in bytes) of the processes in the group `pgid`.
+
+    External binaries started by a tool (NuSMV, clingo, CABEAN, ...) belong to
+    the process group of the tool, so they are accounted for as well.
+    """
+    total = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as _f:
+                stat = _f.read()
+        except OSError:
+            continue
+        # fields after the command name, starting from field 3 (state)
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if int(fields[2]) == pgid:
+            total += int(fields[21]) * _PAGE_SIZE
+    return total
+
+
+def _kill_group(pgid: int):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _supervised_main(conn, func, args):
+    os.setsid()
+    try:
+        conn.send((STATUS_OK, func(*args)))
+    except MemoryError as e:
+        conn.send((STATUS_OOM, f"MemoryError: {e}"))
+    except BaseException as e:
+        conn.send((STATUS_ERROR, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_supervised(
+    func, args: tuple = (), timeout: float | None = None, max_rss: int | None = None
+) -> tuple[str, object]:
+    """Run `func(*args)` in a forked child process with a hard time/memory budget.
+
+    The child runs in its own process group, which is killed as a whole when
+    the wall-clock `timeout` (seconds) or the resident memory limit `max_rss`
+    (bytes) is exceeded.
+
+    Returns:
+        tuple[str, object]: the status (one of `STATUS_*`) and either the
+        return value of `func` (`STATUS_OK`) or an error message.
+    """
+    ctx = multiprocessing.get_context("fork")
+    recv_conn, send_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_supervised_main, args=(send_conn, func, args))
+    proc.start()
+    send_conn.close()
+
+    status, payload = None, None
+    start = time.monotonic()
+    try:
+        while True:
+            if recv_conn.poll(POLL_INTERVAL):
+                try:
+                    status, payload = recv_conn.recv()
+                except EOFError:
+                    pass  # the child died without reporting
+                break
+            elapsed = time.monotonic() - start
+            if timeout is not None and elapsed > timeout:
+                status, payload = STATUS_TIMEOUT, f"killed after {elapsed:.1f}s"
+                break
+            if max_rss is not None and (rss := process_group_rss(proc.pid)) > max_rss:
+                status, payload = STATUS_OOM, f"killed at {rss / 2**20:.0f}MB RSS"
+                break
+    finally:
+        _kill_group(proc.pid)
+        proc.join()
+        recv_conn.close()
+
+    if status is None:
+        # e.g., killed by the kernel OOM killer
+        status = STATUS_OOM if proc.exitcode == -signal.SIGKILL else STATUS_ERROR
+        payload = f"exited with code {proc.exitcode}"
+    return status, payload
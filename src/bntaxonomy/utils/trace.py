@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import cProfile
+import itertools
+import json
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+
+# Spans are written as JSON lines, one complete ("ph": "X") event of the
+# Chrome trace event format per span. The `args` of an event hold the tags of
+# the experiment (instance, tool), the phase, the id of the span and of its
+# parent, the CPU time of the process during the span (`cpu_dur`, in
+# microseconds like `dur`) and the memory of the process. Processes of a sweep (jobs,
+# supervised tool runs) append to the same file.
+#
+# Phases of the experiment pipeline:
+PHASE_PROPAGATION = "propagation"
+PHASE_TOOL = "tool"  # a whole tool run, including its supervision
+PHASE_PRIMES = "primes"
+PHASE_ATTRACTORS = "attractors"
+PHASE_SOLVE = "solve"
+PHASE_POSTPROCESS = "postprocess"
+PHASE_GRAPH_EXPORT = "graph_export"
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+_writer: TraceWriter | None = None
+_span_ids = itertools.count(1)
+_parent: contextvars.ContextVar[str | None] = contextvars.ContextVar("trace_parent", default=None)
+_tags: contextvars.ContextVar[dict] = contextvars.ContextVar("trace_tags", default={})
+_phase: contextvars.ContextVar[str | None] = contextvars.ContextVar("trace_phase", default=None)
+
+
+class TraceWriter:
+    def __init__(self, fname: str):
+        self.fname = fname
+        self._lock = threading.Lock()
+        # line buffered, so that forked processes never inherit pending events
+        self._file = open(fname, "a", buffering=1)
+
+    def write(self, event: dict):
+        line = json.dumps(event) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        self._file.close()
+
+
+def configure_tracing(fname: str | None):
+    """Appends the spans of this process (and of its children) to `fname`.
+
+    Tracing is disabled if `fname` is None.
+    """
+    global _writer
+    if _writer is not None:
+        _writer.close()
+    _writer = TraceWriter(fname) if fname else None
+
+
+def tracing_enabled() -> bool:
+    return _writer is not None
+
+
+@contextlib.contextmanager
+def trace_tags(**tags):
+    """Tags (e.g. instance, tool) recorded with the spans opened inside."""
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def _rss() -> int:
+    try:
+        with open("/proc/self/statm") as _f:
+            return int(_f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return 0
+
+
+@contextlib.contextmanager
+def span(name: str, phase: str | None = None, **args):
+    """Records the duration of the enclosed block as a span of the trace.
+
+    Spans without a `phase` belong to the phase of their parent (or to their
+    own name at the top level). Besides the resident memory at both ends of
+    the span, `max_rss` gives the peak resident memory of the process when the
+    span ends.
+    """
+    if _writer is None:
+        yield
+        return
+    span_id = f"{os.getpid()}:{next(_span_ids)}"
+    parent = _parent.get()
+    phase = phase or _phase.get() or name
+    token = _parent.set(span_id)
+    phase_token = _phase.set(phase)
+    ts = time.time_ns() // 1000
+    start = time.perf_counter_ns()
+    cpu_start = time.process_time_ns()
+    rss_start = _rss()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        dur = (time.perf_counter_ns() - start) // 1000
+        cpu_dur = (time.process_time_ns() - cpu_start) // 1000
+        _parent.reset(token)
+        _phase.reset(phase_token)
+        event_args = {**_tags.get(), **args, "phase": phase}
+        event_args.update(
+            id=span_id,
+            parent=parent,
+            cpu_dur=cpu_dur,
+            rss_start=rss_start,
+            rss_end=_rss(),
+            max_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        )
+        if error is not None:
+            event_args["error"] = error
+        if _writer is not None:
+            _writer.write(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": ts,
+                    "dur": dur,
+                    "pid": os.getpid(),
+                    "tid": threading.get_native_id(),
+                    "args": event_args,
+                }
+            )
+
+
+@contextlib.contextmanager
+def profiled(fname: str | None, profiler: str = "cprofile"):
+    """Profiles the enclosed block to `fname` (no-op if `fname` is None).
+
+    `cprofile` dumps pstats data; `pyinstrument` (if installed) writes an
+    HTML report.
+    """
+    if fname is None:
+        yield
+        return
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            profiler = "cprofile"
+        else:
+            prof = Profiler()
+            prof.start()
+            try:
+                yield
+            finally:
+                prof.stop()
+                with open(f"{fname}.html", "w") as _f:
+                    _f.write(prof.output_html())
+            return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(f"{fname}.prof")
+
+
+def read_trace(fname: str) -> list[dict]:
+    events = list()
+    with open(fname) as _f:
+        for line in _f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+def export_chrome_trace(fname: str, out_fname: str):
+    """Converts a trace to a file loadable in chrome://tracing or Perfetto."""
+    with open(out_fname, "w") as _f:
+        json.dump({"traceEvents": read_trace(fname), "displayTimeUnit": "ms"}, _f)
+
+
+def phase_stats(fname: str) -> dict[tuple[str, str, str], dict[str, float]]:
+    """Wall time, CPU time (in seconds) and peak resident memory (in bytes)
+    per (instance, tool, phase) of a trace.
+
+    Spans nested in a span of the same phase are not counted twice, but the
+    times of a phase include the nested spans of other phases (e.g. `solve`
+    includes the `primes` computed by the tool).
+    """
+    events = read_trace(fname)
+    phases = {e["args"]["id"]: e["args"]["phase"] for e in events}
+    stats = defaultdict(lambda: {"wall": 0.0, "cpu": 0.0, "max_rss": 0})
+    for e in events:
+        a = e["args"]
+        key = (a.get("instance", ""), a.get("tool", ""), a["phase"])
+        stats[key]["max_rss"] = max(stats[key]["max_rss"], a.get("max_rss", 0))
+        if a.get("parent") is not None and phases.get(a["parent"]) == a["phase"]:
+            continue
+        stats[key]["wall"] += e["dur"] / 1e6
+        stats[key]["cpu"] += a.get("cpu_dur", 0) / 1e6
+    return dict(stats)
+
+
+def phase_totals(fname: str) -> dict[tuple[str, str, str], float]:
+    """Total wall time (in seconds) per (instance, tool, phase) of a trace."""
+    return {key: s["wall"] for key, s in phase_stats(fname).items()}